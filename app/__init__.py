@@ -1,6 +1,7 @@
 # app/__init__.py
 # ------------------------------------------------------------
 # Flask application factory with clear, layered registration:
+# - configure_template_cache()  (production only)
 # - register_extensions()
 # - register_blueprints()
 # - register_template_filters()
@@ -16,25 +17,33 @@
 # ------------------------------------------------------------
 
 import os
+from collections import deque
 from dotenv import load_dotenv
 
 from flask import Flask, url_for, request
+from jinja2 import FileSystemBytecodeCache
 from flask_login import current_user
 
 from .config import Config
-from .extensions import db, migrate, login_manager, mail
+from .extensions import db, migrate, login_manager, mail, cache
 from .models import User  # ensure models registered
+from .services import card_pending  # noqa: F401  (registers Account.pending_total flush hooks)
+from .services import cache_versions  # noqa: F401  (registers cache version session hooks)
 from .navigation import MENU
 
 # Load environment from .env exactly once
 load_dotenv()
 
+_CURRENCY_SYMBOLS = {"KRW": "₩", "BDT": "৳"}
+
 
 def create_app() -> Flask:
     app = Flask(__name__)
     env = os.getenv("FLASK_ENV", "development").lower()
     cfg = "app.config.Production" if env == "production" else "app.config.Development"
     app.config.from_object(cfg)
+    if env == "production":
+        configure_template_cache(app)
 
     register_extensions(app)
     register_blueprints(app)   # <--- this runs the block above
@@ -42,9 +51,10 @@ def create_app() -> Flask:
     register_context_processors(app)
     register_cli(app)
     register_error_handlers(app)
-    # Start background scheduler
-    from .scheduler import start_scheduler
-    start_scheduler(app)
+    # Start background scheduler (imported lazily; never under tests)
+    if not app.config.get("TESTING"):
+        from .scheduler import start_scheduler
+        start_scheduler(app)
     return app
 
 
@@ -52,12 +62,29 @@ def create_app() -> Flask:
 # ---------------------------
 # Registrations (by concern)
 # ---------------------------
+def configure_template_cache(app: Flask) -> None:
+    """
+    Production only: stop stat'ing templates on every render and persist
+    compiled bytecode under instance/jinja_cache/ so workers skip re-parsing.
+    """
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+
+    cache_dir = os.path.join(app.instance_path, "jinja_cache")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return  # read-only instance dir; in-memory template cache still applies
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
 def register_extensions(app: Flask) -> None:
-    """Initialize Flask extensions (db, migrate, login manager, mail)."""
+    """Initialize Flask extensions (db, migrate, login manager, mail, cache)."""
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
+    cache.init_app(app)
 
     # Where to redirect unauthenticated users
     login_manager.login_view = "auth.login"
@@ -66,7 +93,7 @@ def register_extensions(app: Flask) -> None:
     def load_user(user_id: str):
         # Simple integer PK loader
         try:
-            return User.query.get(int(user_id))
+            return db.session.get(User, int(user_id))
         except Exception:
             return None
 
@@ -109,15 +136,9 @@ def register_template_filters(app: Flask) -> None:
         Accepts an enum/string or an Account object with a `.currency` attr.
         Returns a symbol for known currencies, else empty string.
         """
-        code = None
-        try:
-            code = getattr(code_or_account, "currency", None)
-            code = getattr(code, "value", code)  # enum -> value
-        except Exception:
-            pass
-        if not code:
-            code = str(code_or_account)
-        return {"KRW": "₩", "BDT": "৳"}.get(str(code), "")
+        code = getattr(code_or_account, "currency", None) or code_or_account
+        code = getattr(code, "value", code)  # enum -> value
+        return _CURRENCY_SYMBOLS.get(code if isinstance(code, str) else str(code), "")
 
     app.jinja_env.globals["currency_symbol"] = _currency_symbol
 
@@ -141,43 +162,68 @@ def register_context_processors(app: Flask) -> None:
                 return "#"  # endpoint missing; avoid crash during dev
         return item.get("url", "#")
 
-    def is_active(endpoint_name: str | None, href: str | None = None) -> bool:
-        if endpoint_name and request.endpoint == endpoint_name:
-            return True
-        if href and href != "#" and request.path == href:
-            return True
-        return False
-
-    def any_child_active(children: list | None) -> bool:
-        if not children:
-            return False
-        for c in children:
-            href = normalize_href(c)
-            if is_active(c.get("endpoint"), href) or any_child_active(c.get("children")):
-                return True
-        return False
+    # Role-filtered menu shape with precomputed hrefs. MENU never changes at
+    # runtime, so each (auth, role, script_root) tree is built once and reused;
+    # only the _active/_open flags are recomputed per request.
+    _role_tree_cache: dict[tuple, list[dict]] = {}
+
+    def _build_role_tree(items: list[dict]) -> list[dict]:
+        out: list[dict] = []
+        for it in items:
+            if not user_has_access(it):
+                continue
+            node = dict(it)
+            desc_endpoints: set[str] = set()
+            desc_paths: set[str] = set()
+            if "children" in it:
+                node["children"] = _build_role_tree(it["children"])
+                for c in node["children"]:
+                    desc_endpoints |= c["_desc_endpoints"]
+                    desc_paths |= c["_desc_paths"]
+                    if c["_endpoint"]:
+                        desc_endpoints.add(c["_endpoint"])
+                    if c["_href"] != "#":
+                        desc_paths.add(c["_href"])
+            node["_href"] = normalize_href(it)
+            node["_endpoint"] = it.get("endpoint")
+            # Everything below this node, so "is any child active" is a set lookup
+            node["_desc_endpoints"] = frozenset(desc_endpoints)
+            node["_desc_paths"] = frozenset(desc_paths)
+            out.append(node)
+        return out
+
+    def _mark_active(tree: list[dict], endpoint: str | None, path: str) -> list[dict]:
+        # Iterative walk (no recursion): each level is copied and flagged independently
+        out: list[dict] = []
+        queue = deque([(tree, out)])
+        while queue:
+            nodes, dest = queue.popleft()
+            for node in nodes:
+                new_it = dict(node)
+                href = node["_href"]
+                active = (bool(node["_endpoint"]) and endpoint == node["_endpoint"]) or (
+                    href != "#" and path == href
+                )
+                new_it["_active"] = active
+                new_it["_open"] = (
+                    active or endpoint in node["_desc_endpoints"] or path in node["_desc_paths"]
+                )
+                if "children" in node:
+                    new_it["children"] = []
+                    queue.append((node["children"], new_it["children"]))
+                dest.append(new_it)
+        return out
 
     def filtered_menu() -> list[dict]:
-        def allow(item: dict) -> bool:
-            return user_has_access(item)
-
-        def walk(items: list[dict]) -> list[dict]:
-            out: list[dict] = []
-            for it in items:
-                if not allow(it):
-                    continue
-                new_it = dict(it)
-                # Normalize children first
-                if "children" in it:
-                    new_it["children"] = walk(it["children"])
-                # Precompute href/active/open
-                new_it["_href"] = normalize_href(it)
-                new_it["_active"] = is_active(it.get("endpoint"), new_it["_href"])
-                new_it["_open"] = new_it["_active"] or any_child_active(new_it.get("children"))
-                out.append(new_it)
-            return out
-
-        return walk(MENU)
+        key = (
+            bool(getattr(current_user, "is_authenticated", False)),
+            getattr(current_user, "role", None),
+            request.script_root,
+        )
+        tree = _role_tree_cache.get(key)
+        if tree is None:
+            tree = _role_tree_cache[key] = _build_role_tree(MENU)
+        return _mark_active(tree, request.endpoint, request.path)
 
     @app.context_processor
     def _inject_navigation():
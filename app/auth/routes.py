@@ -16,14 +16,15 @@ from urllib.parse import urlencode, urlparse
 
 from flask import request, render_template, redirect, url_for
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash, generate_password_hash
+from sqlalchemy import bindparam, exists, select
 
-from app.utils.email_utils import send_mail
+from app.utils.email_utils import send_mail_async
+from app.utils.passwords import hash_password, needs_rehash, verify_password
 
 from ..extensions import db
 from ..models import User
 from . import auth  # blueprint: defined in app/auth/__init__.py
-from app.utils.helpers import get_page_title  # optional, if you use it in templates
+from app.utils.helpers import endpoint_url, get_page_title  # optional, if you use it in templates
 
 
 # ---------------------------
@@ -33,22 +34,38 @@ from app.utils.helpers import get_page_title  # optional, if you use it in templ
 from itsdangerous import URLSafeTimedSerializer
 from flask import current_app
 
-def _serializer():
-    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
+def _serializer() -> URLSafeTimedSerializer:
+    """One serializer per app (key + salt derivation happens once per process)."""
+    s = getattr(current_app, "_reset_serializer", None)
+    if s is None:
+        s = URLSafeTimedSerializer(
+            current_app.config["SECRET_KEY"],
+            salt=current_app.config["SECURITY_PASSWORD_SALT"],
+        )
+        current_app._reset_serializer = s
+    return s
 
 def generate_reset_token(email: str) -> str:
-    s = _serializer()
-    salt = current_app.config["SECURITY_PASSWORD_SALT"]
-    return s.dumps(email, salt=salt)
+    return _serializer().dumps(email)
 
 def verify_reset_token(token: str, max_age_seconds: int = 3600) -> str | None:
-    s = _serializer()
-    salt = current_app.config["SECURITY_PASSWORD_SALT"]
     try:
-        return s.loads(token, salt=salt, max_age=max_age_seconds)
+        return _serializer().loads(token, max_age=max_age_seconds)
     except Exception:
         return None
 
+# Compiled once; every email lookup hits the unique users.email index
+_USER_BY_EMAIL = select(User).where(User.email == bindparam("email")).limit(1)
+
+# SELECT EXISTS(...) — existence only, no row hydration
+_EMAIL_EXISTS = select(exists().where(User.email == bindparam("email")))
+
+def _user_by_email(email: str) -> User | None:
+    return db.session.execute(_USER_BY_EMAIL, {"email": email}).scalar_one_or_none()
+
+def _email_taken(email: str) -> bool:
+    return bool(db.session.scalar(_EMAIL_EXISTS, {"email": email}))
+
 def _is_safe_url(target: str) -> bool:
     """
     Allow relative redirects within the same site only.
@@ -65,11 +82,17 @@ def _is_safe_url(target: str) -> bool:
     return (test_url.scheme, test_url.netloc) == (ref_url.scheme, ref_url.netloc)
 
 
+def _endpoint_url(endpoint: str, **kwargs) -> str:
+    if kwargs:
+        return url_for(endpoint, **kwargs)
+    return endpoint_url(endpoint)
+
+
 def _redirect_with_message(endpoint: str, *, warning: str | None = None, success: str | None = None, **kwargs):
     """
     Redirect to endpoint with optional ?warning=... or ?success=...
     """
-    base = url_for(endpoint, **kwargs)
+    base = _endpoint_url(endpoint, **kwargs)
     qs = {}
     if warning:
         qs["warning"] = warning
@@ -92,7 +115,7 @@ def login():
     """
     if current_user.is_authenticated:
         # Already logged in; go home
-        return redirect(url_for("main.index"))
+        return redirect(_endpoint_url("main.index"))
 
     if request.method == "POST":
         email = (request.form.get("email") or "").strip().lower()
@@ -103,10 +126,16 @@ def login():
         if not email or not password:
             return _redirect_with_message("auth.login", warning="Email and password are required")
 
-        user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(getattr(user, "password_hash", ""), password):
+        user = _user_by_email(email)
+        # Unknown email still pays for one verify (no timing oracle)
+        if not verify_password(getattr(user, "password_hash", None), password):
             return _redirect_with_message("auth.login", warning="Invalid email or password")
 
+        # Upgrade legacy werkzeug hashes to argon2 on successful login
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(password)
+            db.session.commit()
+
         # Log in
         login_user(user)
 
@@ -116,7 +145,7 @@ def login():
 
         # Default post-login page — change to your preferred page
         # e.g., "main.payments_page"
-        return redirect(url_for("main.index"))
+        return redirect(_endpoint_url("main.index"))
 
     # GET
     # If you pass a 'next' param in the URL, keep it in a hidden field in the form.
@@ -146,7 +175,7 @@ def register():
       and limit to admins, or remove entirely.
     """
     if current_user.is_authenticated:
-        return redirect(url_for("main.index"))
+        return redirect(_endpoint_url("main.index"))
 
     if request.method == "POST":
         # TODO: Adjust field names to your form
@@ -163,7 +192,7 @@ def register():
             return _redirect_with_message("auth.register", warning="Passwords do not match")
 
         # Prevent duplicate users
-        if User.query.filter_by(email=email).first():
+        if _email_taken(email):
             return _redirect_with_message("auth.register", warning="Email is already registered")
 
         # Create user
@@ -173,7 +202,7 @@ def register():
             # TODO: adapt to your User model fields. If you store 'role', set a default here.
         )
         # Assuming your model uses a 'password_hash' column:
-        user.password_hash = generate_password_hash(password)
+        user.password_hash = hash_password(password)
 
         db.session.add(user)
         db.session.commit()
@@ -189,8 +218,15 @@ def register():
 
 # ---------------------------
 # Forgot Password (optional)
+_RESET_EMAIL_HTML = """
+    <p>Hello,</p>
+    <p>Click the link below to reset your password (valid for 1 hour):</p>
+    <p><a href="{reset_url}">{reset_url}</a></p>
+    <p>If you didn't request this, you can ignore this email.</p>
+"""
+
 def _redir(endpoint, **qs):
-    base = url_for(endpoint)
+    base = _endpoint_url(endpoint)
     return redirect(f"{base}?{urlencode(qs)}") if qs else redirect(base)
 
 @auth.route("/forgot", methods=["GET", "POST"], endpoint="forgot_password")
@@ -201,18 +237,13 @@ def forgot_password():
         if email:
             token = generate_reset_token(email)
             reset_url = url_for("auth.reset_password", token=token, _external=True)
-            # Build a simple HTML email
-            html = f"""
-                <p>Hello,</p>
-                <p>Click the link below to reset your password (valid for 1 hour):</p>
-                <p><a href="{reset_url}">{reset_url}</a></p>
-                <p>If you didn't request this, you can ignore this email.</p>
-            """
-            try:
-                send_mail(email, "Reset your password", html, f"Reset your password: {reset_url}")
-            except Exception as e:
-                # In dev you can print(e); in prod you might log it.
-                pass
+            # Sent from the background mail pool; the response doesn't wait on SMTP
+            send_mail_async(
+                email,
+                "Reset your password",
+                _RESET_EMAIL_HTML.format(reset_url=reset_url),
+                f"Reset your password: {reset_url}",
+            )
         return render_template("auth/forgot_sent.html", email=email)
 
     return render_template("auth/forgot.html")
@@ -231,10 +262,10 @@ def reset_password(token):
             return _redir("auth.reset_password", token=token, warning="Both fields are required")
         if pw != pw2:
             return _redir("auth.reset_password", token=token, warning="Passwords do not match")
-        user = User.query.filter_by(email=email).first()
+        user = _user_by_email(email)
         if not user:
             return _redir("auth.login", warning="Account not found")
-        user.password_hash = generate_password_hash(pw)
+        user.password_hash = hash_password(pw)
         db.session.commit()
         return _redir("auth.login", success="Password updated. Please sign in.")
 
@@ -61,3 +61,12 @@ def register_cli(app):
 
         db.session.commit()
         print("✅ Seeded minimal data.")
+
+    @app.cli.command("reconcile-pending")
+    def reconcile_pending():
+        """Recompute every account's pending_total from the transaction ledgers."""
+        from .services.card_pending import reconcile_pending_totals
+
+        n = reconcile_pending_totals()
+        db.session.commit()
+        print(f"✅ Reconciled pending totals for {n} account(s).")
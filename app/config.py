@@ -1,10 +1,26 @@
 # app/config.py
 import os
 
+
+def _engine_options(uri: str) -> dict:
+    """
+    Merged over the pool options in extensions.py.
+    - query_cache_size: sized LRU for SQLAlchemy's compiled-statement cache
+      (the app issues many small, repeated queries).
+    - psycopg (v3) only: server-side PREPARE after 5 executions of a statement.
+      psycopg2 has no such option, so it is left alone.
+    """
+    opts: dict = {"query_cache_size": 1200}
+    if uri.startswith("postgresql+psycopg://"):
+        opts["connect_args"] = {"prepare_threshold": 5}
+    return opts
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///expense_tracker.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
 
     SECURITY_PASSWORD_SALT = os.getenv("SECURITY_PASSWORD_SALT", "dev_pw_salt")
 
@@ -17,6 +33,14 @@ class Config:
     MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER")
 
+    # Flask-Caching: Redis when REDIS_URL is set (shared by all workers).
+    # Without it caching is off: the version tokens in services/cache_versions.py
+    # only invalidate correctly when every worker sees the same cache.
+    CACHE_TYPE = "RedisCache" if os.getenv("REDIS_URL") else "NullCache"
+    CACHE_REDIS_URL = os.getenv("REDIS_URL")
+    CACHE_KEY_PREFIX = "expense_tracker:"
+    CACHE_DEFAULT_TIMEOUT = 300
+
 class Development(Config):
     pass  # allows SQLite fallback
 
@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_mail import Mail
+from flask_caching import Cache
 
 db = SQLAlchemy(engine_options={
     "pool_pre_ping": True,
@@ -11,3 +12,4 @@ db = SQLAlchemy(engine_options={
 migrate = Migrate()
 login_manager = LoginManager()
 mail = Mail()
+cache = Cache()
@@ -2,13 +2,83 @@
 # ---------------------------------
 # Create / Update / Delete / Reorder accounts. All actions scoped to the owner.
 
-from flask import request, redirect, url_for
+import re
+
+from flask import request
 from flask_login import login_required, current_user
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
-from sqlalchemy import case,func
+from decimal import Decimal
+from sqlalchemy import bindparam, func, select, update
 from ..extensions import db
+from ..utils.helpers import redirect_to
 from ..models import TransactionKRW, TransactionBDT, Currency, AccountType, Account
 from . import main
+
+
+# Fixed value sets: plain dict lookups instead of Enum(value) + try/except
+_CURRENCY_BY_STR = {c.value: c for c in Currency}
+_TYPE_BY_STR = {t.value: t for t in AccountType}
+
+# "1234", "-12.5", "+0.999" — sign, digits, optional fraction
+_AMOUNT_RE = re.compile(r"([+-]?)(\d*)(?:\.(\d*))?")
+
+
+def _parse_cents(s: str) -> int | None:
+    """Parse a money string into integer cents (ROUND_HALF_UP); None if malformed."""
+    m = _AMOUNT_RE.fullmatch(s)
+    if not m or not (m[2] or m[3]):
+        return None
+    frac = m[3] or ""
+    cents = int(m[2] or 0) * 100 + int((frac + "00")[:2])
+    if len(frac) > 2 and frac[2] >= "5":
+        cents += 1
+    return -cents if m[1] == "-" else cents
+
+
+def _cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)  # 12345 -> Decimal("123.45")
+
+
+def _txn_sum_subquery(Txn):
+    """COALESCE(SUM(amount), 0) of an account's live txns (bound: :u user, :a account)."""
+    return (
+        select(func.coalesce(func.sum(Txn.amount), 0))
+        .where(
+            Txn.user_id == bindparam("u"),
+            Txn.account_id == bindparam("a"),
+            Txn.is_deleted.is_(False),
+        )
+        .scalar_subquery()
+    )
+
+
+# Built once per txn table; SQLAlchemy's compiled cache reuses the SQL on every call.
+#   UPDATE accounts SET initial_balance = :desired - (SELECT COALESCE(SUM(amount), 0) ...)
+_SET_BALANCE_STMTS = {
+    currency: (
+        update(Account)
+        .where(Account.id == bindparam("a"))
+        .values(
+            initial_balance=bindparam("desired", type_=Account.initial_balance.type)
+            - _txn_sum_subquery(Txn)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    for currency, Txn in ((Currency.KRW, TransactionKRW), (Currency.BDT, TransactionBDT))
+}
+
+
+def _set_displayed_balance(acc: Account, desired: Decimal) -> None:
+    """
+    Set initial_balance so that initial_balance + SUM(live txns) == desired,
+    computing the SUM inside the UPDATE itself (one round-trip, no Python math).
+    """
+    db.session.execute(
+        _SET_BALANCE_STMTS[acc.currency],
+        {"u": acc.user_id, "a": acc.id, "desired": desired},
+    )
+    db.session.expire(acc, ["initial_balance"])
+
+
 # ---------------------------
 # Accounts (CREATE) — input is "desired current balance"
 # ---------------------------
@@ -24,73 +94,43 @@ def account_create():
     is_active = bool(request.form.get("is_active"))
 
     if not name:
-        return redirect(url_for("main.payments_page", warning="Account name required"))
+        return redirect_to("main.payments_page", warning="Account name required")
 
     # Validate enums
-    try:
-        currency_enum = Currency(currency)
-        type_enum     = AccountType(acc_type)
-    except ValueError:
-        return redirect(url_for("main.payments_page", warning="Invalid type/currency"))
+    currency_enum = _CURRENCY_BY_STR.get(currency)
+    type_enum     = _TYPE_BY_STR.get(acc_type)
+    if currency_enum is None or type_enum is None:
+        return redirect_to("main.payments_page", warning="Invalid type/currency")
 
-    # Parse numbers
-    try:
-        desired_balance = Decimal(init_str or "0").quantize(Decimal("0.01"))
-    except InvalidOperation:
-        desired_balance = Decimal("0.00")
+    # Parse numbers as integer cents; convert to Decimal only at the DB write
+    desired_balance = _cents_to_decimal(_parse_cents(init_str or "0") or 0)
+    desired_limit = _cents_to_decimal(_parse_cents(limit_str or "0") or 0)
 
-    try:
-        desired_limit = Decimal(limit_str or "0").quantize(Decimal("0.01"))
-    except InvalidOperation:
-        desired_limit = Decimal("0.00")
-
-    # Create the account first
+    is_credit = type_enum == AccountType.credit
     acc = Account(
         user_id=current_user.id,
         name=name,
         currency=currency_enum,
         type=type_enum,
-        initial_balance=Decimal("0.00"),
-        credit_limit=None,
+        initial_balance=0,
+        # Credit cards: set available limit now; no balance math
+        credit_limit=desired_limit if is_credit else None,
         is_active=is_active,
     )
-    db.session.add(acc)
-    db.session.commit()  # acc.id available
-
-    # Credit cards: set available limit now; no balance math
-    if type_enum == AccountType.credit:
-        acc.credit_limit = desired_limit
+    # One transaction: INSERT (+ balance UPDATE for non-credit), commit once
+    try:
+        db.session.add(acc)
+        if not is_credit:
+            # Non-credit: set initial_balance so displayed == desired
+            # displayed = initial_balance + sum(txns); flush first for acc.id
+            db.session.flush()
+            _set_displayed_balance(acc, desired_balance)
         db.session.commit()
-        return redirect(url_for("main.payments_page"))
-
-    # Non-credit: set initial_balance so displayed == desired
-    # displayed = initial_balance + sum(txns)
-    if currency_enum == Currency.KRW:
-        txn_sum = (
-            db.session.query(func.coalesce(func.sum(TransactionKRW.amount), 0))
-            .filter(
-                TransactionKRW.user_id == current_user.id,
-                TransactionKRW.account_id == acc.id,
-                TransactionKRW.is_deleted.is_(False),
-            )
-            .scalar()
-        )
-    else:
-        txn_sum = (
-            db.session.query(func.coalesce(func.sum(TransactionBDT.amount), 0))
-            .filter(
-                TransactionBDT.user_id == current_user.id,
-                TransactionBDT.account_id == acc.id,
-                TransactionBDT.is_deleted.is_(False),
-            )
-            .scalar()
-        )
-
-    txn_sum = Decimal(txn_sum or 0).quantize(Decimal("0.01"))
-    acc.initial_balance = (desired_balance - txn_sum).quantize(Decimal("0.01"))
-    db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    return redirect(url_for("main.payments_page"))
+    return redirect_to("main.payments_page")
 
 # ---------------------------
 # Accounts (UPDATE)
@@ -103,61 +143,36 @@ def account_update():
     acc_id = request.form.get("id", type=int)
     acc = db.session.get(Account, acc_id)
     if not acc or acc.user_id != current_user.id:
-        return redirect(url_for("main.payments_page", warning="Account not found"))
+        return redirect_to("main.payments_page", warning="Account not found")
 
     # Basic editable fields
     name = (request.form.get("name") or "").strip()
-    currency = request.form.get("currency") or getattr(acc.currency, "value", "KRW")
-    acc_type = request.form.get("type") or getattr(acc.type, "value", "bank")
+    currency_enum = _CURRENCY_BY_STR.get(request.form.get("currency") or "", acc.currency)
+    type_enum = _TYPE_BY_STR.get(request.form.get("type") or "", acc.type)
     init_str = (request.form.get("initial_balance") or "").strip()
     is_active = bool(request.form.get("is_active"))
 
     if name:
         acc.name = name
-    acc.currency = Currency(currency)
-    acc.type = AccountType(acc_type)
+    acc.currency = currency_enum
+    acc.type = type_enum
     acc.is_active = is_active
 
     # ----- Key behavior: treat input as the desired final balance -----
     # If user provided a value (even "0"), we make displayed balance EXACTLY that.
     if init_str != "":
-        try:
-            desired = Decimal(init_str).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        except InvalidOperation:
+        desired_cents = _parse_cents(init_str)
+        if desired_cents is None:
             # ignore bad input; keep previous initial_balance
             db.session.commit()
-            return redirect(url_for("main.payments_page", warning="Invalid initial balance"))
-
-        # Sum current (non-deleted) transactions for THIS account/user
-        curr_code = getattr(acc.currency, "value", str(acc.currency))
-        if curr_code == "KRW":
-            txn_sum = (
-                db.session.query(func.coalesce(func.sum(TransactionKRW.amount), 0))
-                .filter(
-                    TransactionKRW.user_id == current_user.id,
-                    TransactionKRW.account_id == acc.id,
-                    TransactionKRW.is_deleted.is_(False),
-                )
-                .scalar()
-            )
-        else:
-            txn_sum = (
-                db.session.query(func.coalesce(func.sum(TransactionBDT.amount), 0))
-                .filter(
-                    TransactionBDT.user_id == current_user.id,
-                    TransactionBDT.account_id == acc.id,
-                    TransactionBDT.is_deleted.is_(False),
-                )
-                .scalar()
-            )
-
-        txn_sum = Decimal(txn_sum or 0).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            return redirect_to("main.payments_page", warning="Invalid initial balance")
+        desired = _cents_to_decimal(desired_cents)
 
         # Set stored initial_balance so that: initial_balance + txn_sum == desired
-        acc.initial_balance = (desired - txn_sum).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        _set_displayed_balance(acc, desired)
 
     db.session.commit()
-    return redirect(url_for("main.payments_page"))
+    return redirect_to("main.payments_page")
 
 
 # ---------------------------
@@ -171,7 +186,7 @@ def account_delete():
     if acc and acc.user_id == current_user.id:
         db.session.delete(acc)
         db.session.commit()
-    return redirect(url_for("main.payments_page"))
+    return redirect_to("main.payments_page")
 
 
 # ---------------------------
@@ -185,23 +200,18 @@ def accounts_reorder():
     if not isinstance(order, list) or not order:
         return {"ok": False, "error": "bad payload"}, 400
 
-    # Only reorder THIS user's accounts
-    rows = (
-        db.session.query(Account.id)
-        .filter(Account.user_id == current_user.id, Account.id.in_(order))
-        .all()
-    )
-    if not rows:
-        return {"ok": False, "error": "no accounts matched"}, 404
-
-    # Map: id -> position (10,20,30…)
-    values = {acc_id: (idx + 1) * 10 for idx, acc_id in enumerate(order)}
-
+    # One prepared UPDATE executed per (id, position) pair (driver executemany).
+    # The user_id filter scopes it to THIS user's accounts, so no preflight SELECT.
+    t = Account.__table__
     stmt = (
-        Account.__table__.update()
-        .where(Account.user_id == current_user.id, Account.id.in_(order))
-        .values(display_order=case(values, value=Account.id, else_=Account.display_order))
+        update(t)
+        .where(t.c.id == bindparam("b_id"), t.c.user_id == current_user.id)
+        .values(display_order=bindparam("pos"))
     )
-    db.session.execute(stmt)
+    params = [{"b_id": acc_id, "pos": (idx + 1) * 10} for idx, acc_id in enumerate(order)]
+    result = db.session.execute(stmt, params)
+    if result.rowcount == 0:
+        db.session.rollback()
+        return {"ok": False, "error": "no accounts matched"}, 404
     db.session.commit()
     return {"ok": True}
@@ -4,12 +4,7 @@ from flask import request, jsonify
 from flask_login import login_required, current_user
 from ..main import main
 from ..services.expense_breakdown import expense_breakdown
-
-_SYMBOL = {"KRW": "₩", "BDT": "৳"}
-
-def _fmt_money(sym: str, n: float) -> str:
-    as_int = int(n)
-    return f"{sym}{n:,.2f}" if n != as_int else f"{sym}{as_int:,}"
+from ..utils.helpers import MONEY_FMT
 
 @main.route("/api/expense_breakdown", methods=["GET"])
 @login_required
@@ -26,12 +21,9 @@ def api_expense_breakdown():
     # This service already excludes notes containing "credit ... card" AND "settlement"
     data = expense_breakdown(current_user.id, currency, year, month)
 
-    sym = _SYMBOL.get(currency, "₩")
-    payload = {
-        **data,
-        "total_fmt": _fmt_money(sym, data["total"]),
-        "currency": currency,
-        "year": year,
-        "month": month,
-    }
-    return jsonify(payload)
+    # Fill the service dict in place (no second dict for the payload)
+    data["total_fmt"] = MONEY_FMT[currency](data["total"])
+    data["currency"] = currency
+    data["year"] = year
+    data["month"] = month
+    return jsonify(data)
@@ -4,12 +4,22 @@
 
 from flask import request, redirect, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from urllib.parse import urlencode
 
 from . import main
 from ..extensions import db
 from ..models import Category
+from ..services.cache_versions import mark_changed
+
+# Conflict target: matches the ux_category_user_parent_lower expression index
+_CATEGORY_UNIQUE_KEY = [
+    Category.user_id,
+    func.coalesce(Category.parent_id, literal_column("0")),
+    func.lower(Category.name),
+]
 
 # ---------------------------
 # Categories (CREATE)
@@ -23,24 +33,24 @@ def create_category():
     if not name_raw:
         return redirect(url_for("main.payments_page"))
 
-    # Case-insensitive duplicate check within same parent FOR THIS USER
-    exists = (
-        db.session.query(Category.id)
-        .filter(
-            Category.user_id == current_user.id,
-            (Category.parent_id == (parent_id or None)),
-            func.lower(Category.name) == func.lower(name_raw),
-        )
-        .first()
+    # Single INSERT; the case-insensitive unique index decides duplicates
+    # atomically (no SELECT-then-INSERT race). No row back => duplicate.
+    insert = pg_insert if db.session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = (
+        insert(Category)
+        .values(user_id=current_user.id, name=name_raw, parent_id=parent_id or None)
+        .on_conflict_do_nothing(index_elements=_CATEGORY_UNIQUE_KEY)
+        .returning(Category.id)
     )
-    if exists:
+    new_id = db.session.execute(stmt).scalar()
+    if new_id is None:
+        db.session.rollback()
         qs = urlencode({"error": "duplicate", "dup_name": name_raw})
         return redirect(f"{url_for('main.payments_page')}?{qs}")
 
-    cat = Category(user_id=current_user.id, name=name_raw, parent_id=parent_id or None)
-    db.session.add(cat)
+    mark_changed(db.session, "category", current_user.id)  # Core INSERT: not seen by the flush hook
     db.session.commit()
-    return redirect(url_for("main.payments_page", category_id=cat.id))
+    return redirect(url_for("main.payments_page", category_id=new_id))
 
 
 # ---------------------------
@@ -54,7 +64,11 @@ def delete_category(category_id: int):
     if not cat or cat.user_id != current_user.id:
         return redirect(url_for("main.payments_page"))
 
-    if cat.children and len(cat.children) > 0:
+    # EXISTS probe instead of loading the whole .children collection
+    has_child = db.session.query(
+        select(Category.id).where(Category.parent_id == cat.id).exists()
+    ).scalar()
+    if has_child:
         # Optional: return a message to UI that child categories exist
         return redirect(url_for("main.payments_page", category_id=category_id))
 
@@ -1,12 +1,17 @@
 # app/routes/debt.py
 from datetime import date, datetime
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify
+from flask import Blueprint, abort, render_template, request, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 from decimal import Decimal
 from ..extensions import db
 from ..models import DebtItem, DebtTxn, DebtDirection, Recipient, Currency
 from . import main
-from sqlalchemy import func, case, desc 
+from sqlalchemy import bindparam, case, desc, func, insert, lambda_stmt, select, tuple_, type_coerce, update
+from sqlalchemy.orm import contains_eager
+from ..utils.helpers import request_cached
+# 'owe' / 'lend' -> enum; also the single validity gate for direction filters
+_DIR = {d.value: d for d in DebtDirection}
+
 def _uid():
     return current_user.id
 
@@ -34,7 +39,7 @@ def _apply_repayment_to_item(item, amount, when, note):
 
     # Create txn
     txn = DebtTxn(
-        user_id=_uid(),
+        user_id=item.user_id,
         item_id=item.id,
         action="repayment",
         date=when,
@@ -48,24 +53,72 @@ def _apply_repayment_to_item(item, amount, when, note):
 
     return amount - pay
 
-def debt_totals(user_id):
-    # cards: totals + progress for both directions
-    rows = (
-        db.session.query(DebtItem.direction,
-                         db.func.sum(DebtItem.original_principal),
-                         db.func.sum(DebtItem.outstanding_principal))
-        .filter(DebtItem.user_id == user_id, DebtItem.status == "active")
-        .group_by(DebtItem.direction)
-        .all()
+def _allocate_repayment(user_id, recipient_id, direction, amount):
+    """
+    Split `amount` over a person's open items, oldest first, in one query:
+    each item gets min(outstanding, amount - outstanding of the items before it).
+    Returns [(item_id, pay), ...] for the items that receive anything.
+    """
+    prev_cum = func.sum(DebtItem.outstanding_principal).over(
+        order_by=(DebtItem.start_date.asc(), DebtItem.id.asc())
+    ) - DebtItem.outstanding_principal
+    open_items = (
+        select(
+            DebtItem.id,
+            DebtItem.outstanding_principal.label("outstanding"),
+            prev_cum.label("prev_cum"),
+        )
+        .where(
+            DebtItem.user_id == user_id,
+            DebtItem.recipient_id == recipient_id,
+            DebtItem.direction == direction,
+            DebtItem.status == "active",
+            DebtItem.outstanding_principal > 0,
+        )
+        .subquery()
+    )
+    amt = bindparam("amt", amount, type_=DebtItem.outstanding_principal.type)
+    left = amt - open_items.c.prev_cum
+    pay = case((left >= open_items.c.outstanding, open_items.c.outstanding), else_=left)
+    rows = db.session.execute(
+        select(open_items.c.id, type_coerce(pay, DebtItem.outstanding_principal.type))
+        .where(open_items.c.prev_cum < amt)
+        .order_by(open_items.c.prev_cum)
+    ).all()
+    # SQLite sums Numeric as REAL; drop zero shares left by float drift
+    return [(item_id, p) for item_id, p in rows if p > 0]
+
+
+# executemany: one prepared UPDATE per allocated item (:b_id, :pay); an item
+# paid down to zero is settled in the same statement
+_debt_items = DebtItem.__table__
+_pay = bindparam("pay", type_=_debt_items.c.outstanding_principal.type)
+_REPAY_ITEM_STMT = (
+    update(_debt_items)
+    .where(_debt_items.c.id == bindparam("b_id"))
+    .values(
+        outstanding_principal=_debt_items.c.outstanding_principal - _pay,
+        status=case(
+            (_debt_items.c.outstanding_principal - _pay <= 0, "settled"),
+            else_=_debt_items.c.status,
+        ),
     )
+)
+
+@request_cached
+def debt_totals(user_id):
+    # cards: totals + progress for both directions (active items only),
+    # rolled up in Python from the per-person aggregate rows — no extra query
+    person_rows = _person_rollup(user_id)
     data = {
         "owe": {"original": Decimal("0"), "outstanding": Decimal("0")},
         "lend": {"original": Decimal("0"), "outstanding": Decimal("0")},
     }
-    for d, orig, out in rows:
+    for row in person_rows:
+        d = row.direction
         key = d.value if isinstance(d, DebtDirection) else d
-        data[key]["original"] = _sum_or_zero(orig)
-        data[key]["outstanding"] = _sum_or_zero(out)
+        data[key]["original"] += _sum_or_zero(row.active_original)
+        data[key]["outstanding"] += _sum_or_zero(row.active_outstanding)
     for key in data:
         orig = data[key]["original"]
         out = data[key]["outstanding"]
@@ -75,48 +128,102 @@ def debt_totals(user_id):
         data[key]["pct"] = round(pct, 2)
     return data
 
-def list_txns(user_id, t_filter=None, a_filter=None, q=None):
-    qy = (
-        db.session.query(DebtTxn, DebtItem, Recipient)
-        .join(DebtItem, DebtTxn.item_id == DebtItem.id)
-        .join(Recipient, DebtItem.recipient_id == Recipient.id)
-        .filter(DebtTxn.user_id == user_id)
-        .order_by(DebtTxn.date.desc(), DebtTxn.id.desc())
-    )
-    if t_filter in ("owe", "lend"):
-        qy = qy.filter(DebtItem.direction == DebtDirection(t_filter))
+TXN_PAGE_SIZE = 50
+
+# Static statement shapes are built once at import; the per-call filters below
+# are added inside lambda_stmt, so SQLAlchemy caches the whole statement by
+# lambda identity and skips rebuilding/cache-keying it on every request
+# (closure values such as user_id become bound parameters).
+
+# One SELECT: the filter joins double as the eager load (contains_eager),
+# so txn.item / txn.item.recipient never lazy-load during template render.
+_TXNS_BASE = (
+    select(DebtTxn)
+    .join(DebtTxn.item)
+    .join(DebtItem.recipient)
+    .options(contains_eager(DebtTxn.item).contains_eager(DebtItem.recipient))
+    .order_by(DebtTxn.date.desc(), DebtTxn.id.desc())
+)
+
+def list_txns(user_id, t_filter=None, a_filter=None, q=None, before=None):
+    """
+    One page (newest first) of the user's debt txns, keyset-paginated on
+    (date, id): `before` is the (date, id) of the last row already shown.
+    Returns (txns, next_cursor); next_cursor is None on the last page.
+    """
+    stmt = lambda_stmt(lambda: _TXNS_BASE.where(DebtTxn.user_id == user_id))
+    if t_filter in _DIR:
+        direction = _DIR[t_filter]
+        stmt += lambda s: s.where(DebtItem.direction == direction)
     if a_filter in ("add", "repayment"):
-        qy = qy.filter(DebtTxn.action == a_filter)
+        stmt += lambda s: s.where(DebtTxn.action == a_filter)
     if q:
         like = f"%{q.strip()}%"
-        qy = qy.filter(Recipient.name.ilike(like))
-    return qy.limit(200).all()  # simple cap for now
+        stmt += lambda s: s.where(Recipient.name.ilike(like))
+    if before:
+        # range scan on ix_debt_txns_user_date_id instead of OFFSET
+        before_date, before_id = before
+        stmt += lambda s: s.where(tuple_(DebtTxn.date, DebtTxn.id) < tuple_(before_date, before_id))
+
+    # one extra row tells us whether another page exists
+    stmt += lambda s: s.limit(TXN_PAGE_SIZE + 1)
+    txns = db.session.execute(stmt).scalars().all()
+    if len(txns) <= TXN_PAGE_SIZE:
+        return txns, None
+    txns = txns[:TXN_PAGE_SIZE]
+    last = txns[-1]
+    return txns, {"before_date": last.date.isoformat(), "before_id": last.id}
+
+
+def _txn_cursor():
+    """(date, id) from ?before_date=YYYY-MM-DD&before_id=N, or None if absent/invalid."""
+    before_id = request.args.get("before_id", type=int)
+    try:
+        before_date = date.fromisoformat(request.args.get("before_date") or "")
+    except ValueError:
+        return None
+    return (before_date, before_id) if before_id is not None else None
+
+
+# Per (direction, person) aggregates, covered by ix_debt_items_user_status_dir on Postgres
+_is_active = DebtItem.status == "active"
+_ROLLUP_BASE = (
+    select(
+        DebtItem.direction,
+        Recipient.name,
+        func.count(DebtItem.id).label("count"),
+        func.sum(DebtItem.original_principal).label("original"),
+        func.sum(DebtItem.original_principal - DebtItem.outstanding_principal).label("paid"),
+        func.sum(DebtItem.outstanding_principal).label("outstanding"),
+        # True only if EVERY item in the group is settled
+        (func.min(case((DebtItem.status == "settled", 1), else_=0)) == 1).label("is_paid"),
+        func.sum(case((_is_active, DebtItem.original_principal), else_=0)).label("active_original"),
+        func.sum(case((_is_active, DebtItem.outstanding_principal), else_=0)).label("active_outstanding"),
+    )
+    .join(Recipient, DebtItem.recipient_id == Recipient.id)
+    .group_by(DebtItem.direction, Recipient.name)
+    .order_by(desc(func.sum(DebtItem.outstanding_principal)))
+)
 
 # app/routes/debt.py
+@request_cached
+def _person_rollup(user_id):
+    """
+    Per (direction, person) aggregates of the user's DebtItems. Feeds both the
+    per-person table and the top cards (active_* columns).
+    """
+    stmt = lambda_stmt(lambda: _ROLLUP_BASE.where(DebtItem.user_id == user_id))
+    return db.session.execute(stmt).all()
+
+
+@request_cached
 def list_by_person(user_id, t_filter=None):
-    # True only if EVERY item in the group is settled
-    is_paid_expr = (
-        (func.min(case((DebtItem.status == "settled", 1), else_=0)) == 1)
-    ).label("is_paid")
-
-    qy = (
-        db.session.query(
-            DebtItem.direction,
-            Recipient.name,
-            func.count(DebtItem.id).label("count"),
-            func.sum(DebtItem.original_principal).label("original"),
-            func.sum(DebtItem.original_principal - DebtItem.outstanding_principal).label("paid"),
-            func.sum(DebtItem.outstanding_principal).label("outstanding"),
-            is_paid_expr,
-        )
-        .join(Recipient, DebtItem.recipient_id == Recipient.id)
-        .filter(DebtItem.user_id == user_id)
-        .group_by(DebtItem.direction, Recipient.name)
-        .order_by(desc(func.sum(DebtItem.outstanding_principal)))
-    )
-    if t_filter in ("owe", "lend"):
-        qy = qy.filter(DebtItem.direction == DebtDirection(t_filter))
-    return qy.all()
+    person_rows = _person_rollup(user_id)
+    if t_filter in _DIR:
+        direction = _DIR[t_filter]
+        person_rows = [r for r in person_rows if r.direction == direction]
+    # (direction, name, count, original, paid, outstanding, is_paid) as the template expects
+    return [tuple(r)[:7] for r in person_rows]
 # ---------- pages ----------
 @main.route("/debts", methods=["GET"])
 @login_required
@@ -125,37 +232,34 @@ def debts_page():
     a_filter = request.args.get("action")       # 'add' | 'repayment' | None
     q = request.args.get("q")
 
-    cards = debt_totals(_uid())
-    txns = list_txns(_uid(), t_filter, a_filter, q)
-    per_person = list_by_person(_uid(), t_filter)
-    recipients = Recipient.query.filter_by(user_id=_uid()).order_by(Recipient.name).all()
-    # inside debts_page()
-    open_items = (
-        DebtItem.query
-        .filter_by(user_id=_uid(), status="active")
-        .filter(DebtItem.outstanding_principal > 0)
-        .order_by(DebtItem.start_date.desc())
-        .all()
-    )
+    uid = _uid()
+    # One aggregate query (request-cached) feeds both the cards and the per-person table
+    cards = debt_totals(uid)
+    txns, next_cursor = list_txns(uid, t_filter, a_filter, q, before=_txn_cursor())
+    per_person = list_by_person(uid, t_filter)
+    recipients = Recipient.query.filter_by(user_id=uid).order_by(Recipient.name).all()
     return render_template(
         "debts.html",
         page_title="Debt Tracker",
         cards=cards,
         txns=txns,
+        next_cursor=next_cursor,
+        paged=request.args.get("before_id") is not None,
         per_person=per_person,
         recipients=recipients,
         t_filter=t_filter,
         a_filter=a_filter,
         q=q or "",
         page_slug="debts",  # loads css/debts.css if present
-        open_items=open_items,
     )
 
 # ---------- actions: add / repay / edit / delete ----------
 @main.route("/debts/add", methods=["POST"])
 @login_required
 def debts_add():
-    direction = DebtDirection(request.form["direction"])
+    direction = _DIR.get(request.form.get("direction"))
+    if direction is None:
+        abort(400)
     recipient_id = int(request.form["recipient_id"])
     currency = Currency(request.form["currency"])
     amount = Decimal(request.form["amount"])
@@ -164,8 +268,9 @@ def debts_add():
     start_date_str = request.form.get("start_date")
     start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date() if start_date_str else date.today()
 
+    uid = _uid()
     item = DebtItem(
-        user_id=_uid(),
+        user_id=uid,
         direction=direction,
         currency=currency,
         recipient_id=recipient_id,
@@ -179,7 +284,7 @@ def debts_add():
     db.session.flush()
 
     txn = DebtTxn(
-        user_id=_uid(),
+        user_id=uid,
         item_id=item.id,
         action="add",
         date=start_date,
@@ -220,35 +325,42 @@ def debts_repay_person():
     in the given direction (owe / lend), oldest first.
     """
     recipient_id = int(request.form["recipient_id"])
-    direction = DebtDirection(request.form["direction"])  # 'owe' or 'lend'
+    direction = _DIR.get(request.form.get("direction"))  # 'owe' or 'lend'
+    if direction is None:
+        abort(400)
     amount = Decimal(request.form["amount"])
     date_str = request.form.get("date")
     when = datetime.strptime(date_str, "%Y-%m-%d").date() if date_str else date.today()
     note = request.form.get("note") or ""
 
-    # Get all open items for this recipient & direction
-    items = (
-        DebtItem.query
-        .filter_by(
-            user_id=_uid(),
-            recipient_id=recipient_id,
-            direction=direction,
-            status="active",
+    # Allocate oldest-first in SQL, then apply it with one UPDATE + one INSERT
+    uid = _uid()
+    allocation = _allocate_repayment(uid, recipient_id, direction, amount)
+    if allocation:
+        db.session.execute(
+            _REPAY_ITEM_STMT,
+            [{"b_id": item_id, "pay": pay} for item_id, pay in allocation],
+        )
+        db.session.execute(
+            insert(DebtTxn.__table__),
+            [
+                {
+                    "user_id": uid,
+                    "item_id": item_id,
+                    "action": "repayment",
+                    "date": when,
+                    "amount": pay,
+                    "principal_portion": pay,
+                    "interest_portion": Decimal("0"),
+                    "fee_portion": Decimal("0"),
+                    "note": note,
+                }
+                for item_id, pay in allocation
+            ],
         )
-        .filter(DebtItem.outstanding_principal > 0)
-        .order_by(DebtItem.start_date.asc(), DebtItem.id.asc())  # pay oldest first
-        .all()
-    )
-
-    remaining = amount
-
-    for item in items:
-        if remaining <= 0:
-            break
-        remaining = _apply_repayment_to_item(item, remaining, when, note)
 
-    # If remaining > 0 here, it means the user tried to pay more than outstanding.
-    # You can ignore the leftover, or later show a message. For now we just cap at total outstanding.
+    # Paying more than the total outstanding: the leftover is ignored
+    # (capped at total outstanding), as before.
 
     db.session.commit()
     return redirect(url_for("main.debts_page"))
@@ -5,24 +5,15 @@ from flask import jsonify, request, render_template
 from flask_login import login_required, current_user
 from ..main import main
 from ..services.kpi import kpi_for_month
-from app.utils.helpers import get_page_title
+from app.utils.helpers import MONEY_FMT, get_page_title
 from ..services.cashflow import monthly_cashflow
 from ..services.expense_breakdown import expense_breakdown
 from app.services.finance_score import get_finance_score
 from ..models import Account, Currency
 from decimal import Decimal
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 from ..extensions import db
 from app.services.krw_overview import krw_income_spent
-_SYMBOL = {"KRW": "₩", "BDT": "৳"}
-
-def _fmt(sym: str, n: float) -> str:
-    # show decimals only if needed
-    as_int = int(n)
-    return f"{sym}{n:,.2f}" if n != as_int else f"{sym}{as_int:,}"
-def _fmt_money(sym: str, n: float) -> str:
-    as_int = int(n)
-    return f"{sym}{n:,.2f}" if n != as_int else f"{sym}{as_int:,}"
 
 
 @main.route("/", methods=["GET"])
@@ -37,11 +28,9 @@ def index():
 
     cards = kpi_for_month(current_user.id, currency, year, month)
 
-    # Pre-format strings for the template (keeps Jinja simple & fast)
-    sym = _SYMBOL.get(currency, "")
-    def fmt(n):
-        # human-ish formatting; keep decimals if present
-        return f"{sym}{n:,.2f}" if (n % 1) else f"{sym}{int(n):,}"
+    # Pre-format strings for the template (keeps Jinja simple & fast);
+    # shared formatter: one float() check instead of a Decimal modulo per value
+    fmt = MONEY_FMT[currency]
 
     def hydrate(card):
         val = card["value"]
@@ -88,8 +77,15 @@ def index():
     fs = get_finance_score(current_user.id, year=today.year, month=today.month) 
     today = date.today() 
     # --- BDT widget: read balances directly from Account.initial_balance ---
-    bdt_accounts = (
-        db.session.query(Account)
+    # Only the columns the widget shows; the grand total rides along as a
+    # window SUM so it is computed by the DB in the same query.
+    bdt_rows = (
+        db.session.query(
+            Account.id,
+            Account.name,
+            Account.initial_balance,
+            func.coalesce(func.sum(Account.initial_balance).over(), 0).label("total"),
+        )
         .filter(
             Account.user_id == current_user.id,
             Account.currency == Currency.BDT,
@@ -99,18 +95,11 @@ def index():
         .all()
     )
 
-    def _bal(a):
-        v = getattr(a, "initial_balance", None)
-        return Decimal(v or 0)
-
     bdt_accounts_with_bal = [
-        {"id": a.id, "name": a.name, "balance": _bal(a)}
-        for a in bdt_accounts
+        {"id": r.id, "name": r.name, "balance": Decimal(r.initial_balance or 0)}
+        for r in bdt_rows
     ]
-
-    # Top 2 by initial_balance
-    bdt_top2 = bdt_accounts_with_bal[:2]
-    bdt_total_all = sum((x["balance"] for x in bdt_accounts_with_bal), Decimal("0"))
+    bdt_total_all = bdt_rows[0].total if bdt_rows else Decimal("0")
     return render_template(
         "index.html",
         cards={
@@ -142,8 +131,7 @@ def api_cashflow():
         year = date.today().year
 
     data = monthly_cashflow(current_user.id, currency, year)
-    sym = _SYMBOL.get(currency, "")
-    data["total_balance_fmt"] = _fmt(sym, data["total_balance"])
+    data["total_balance_fmt"] = MONEY_FMT[currency](data["total_balance"])
     data["currency"] = currency
     data["year"] = year
     return jsonify(data)
@@ -164,15 +152,12 @@ def api_expense_breakdown():
     # This service already excludes notes containing "credit ... card" AND "settlement"
     data = expense_breakdown(current_user.id, currency, year, month)
 
-    sym = _SYMBOL.get(currency, "₩")
-    payload = {
-        **data,
-        "total_fmt": _fmt_money(sym, data["total"]),
-        "currency": currency,
-        "year": year,
-        "month": month,
-    }
-    return jsonify(payload)
+    # Fill the service dict in place (no second dict for the payload)
+    data["total_fmt"] = MONEY_FMT[currency](data["total"])
+    data["currency"] = currency
+    data["year"] = year
+    data["month"] = month
+    return jsonify(data)
     
 @main.route("/api/krw_income_spent", methods=["GET"], endpoint="api_krw_income_spent")
 @login_required
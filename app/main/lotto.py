@@ -1,13 +1,108 @@
 # app/routes/lotto.py
-from sqlalchemy import func
-from sqlalchemy.orm import aliased
+from collections import namedtuple
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 from flask import render_template, request
-from ..extensions import db
-from ..models import LottoDraw, LottoDrawStats, LottoDrawNumber, LottoGame
+from ..extensions import db, cache
+from ..models import LottoDraw, LottoDrawStats, LottoDrawNumber, LottoDrawPair, LottoGame
 from app.services.lotto_service import add_draw_from_form, generate_smart_picks
 from ..main import main
 from app.utils.helpers import get_page_title
+
+# Plain tuples (not Row objects) so cached analysis results pickle cleanly
+LottoCount = namedtuple("LottoCount", "num cnt")
+LottoPair = namedtuple("LottoPair", "a b cnt")
+
+
+def _stats_distribution(draw_ids, left, right):
+    """{"<left>/<right>": draws} for the given LottoDrawStats column pair."""
+    label = cast(left, String).concat("/").concat(cast(right, String))
+    return dict(
+        db.session.query(label, func.count())
+        .filter(LottoDrawStats.draw_id.in_(draw_ids))
+        .group_by(left, right)
+        .order_by(left, right)
+        .all()
+    )
+
+
+def _empty_analysis():
+    return {
+        "hot_numbers": [],
+        "cold_numbers": [],
+        "top_pairs": [],
+        "odd_even_dist": {},
+        "low_high_dist": {},
+    }
+
+
+@cache.memoize(timeout=3600)
+def _compute_lotto_analysis(game_id, window, last_round, draw_count):
+    """
+    Quick Analysis for the latest `window` draws of a game: hot/cold numbers,
+    top pairs and odd/even + low/high distributions.
+
+    last_round/draw_count are only part of the cache key: adding or deleting
+    a draw changes them, so stale results are never served.
+    """
+    result = _empty_analysis()
+
+    # Latest `window` draws as a subquery, so each query below is a single
+    # statement the planner sees whole (no id list shipped back and forth)
+    top_draws = (
+        db.session.query(LottoDraw.id)
+        .filter(LottoDraw.game_id == game_id)
+        .order_by(LottoDraw.round_no.desc())
+        .limit(window)
+        .subquery()
+    )
+    analysis_draw_ids = select(top_draws.c.id)
+
+    # Per-number counts (main numbers only, exclude bonus) in one GROUP BY;
+    # hot = top 10, cold = bottom 10, ties broken by number.
+    num_counts = (
+        db.session.query(
+            LottoDrawNumber.num.label("num"),
+            func.count().label("cnt"),
+        )
+        .filter(
+            LottoDrawNumber.draw_id.in_(analysis_draw_ids),
+            LottoDrawNumber.is_bonus.is_(False),
+        )
+        .group_by(LottoDrawNumber.num)
+        .all()
+    )
+    num_counts = [LottoCount(r.num, r.cnt) for r in num_counts]
+    result["hot_numbers"] = sorted(num_counts, key=lambda r: (-r.cnt, r.num))[:10]
+    result["cold_numbers"] = sorted(num_counts, key=lambda r: (r.cnt, r.num))[:10]
+
+    # Top Pairs (main numbers only, within selected window)
+    # Pairs are pre-expanded per draw in lotto_draw_pair; count them in the DB.
+    # Same ordering as before: count desc, then a asc, b asc.
+    pair_cnt = func.count()
+    result["top_pairs"] = [
+        LottoPair(a, b, cnt)
+        for a, b, cnt in (
+            db.session.query(LottoDrawPair.a, LottoDrawPair.b, pair_cnt)
+            .filter(LottoDrawPair.draw_id.in_(analysis_draw_ids))
+            .group_by(LottoDrawPair.a, LottoDrawPair.b)
+            .order_by(pair_cnt.desc(), LottoDrawPair.a.asc(), LottoDrawPair.b.asc())
+            .limit(20)
+            .all()
+        )
+    ]
+
+    # Distributions from stats, counted by the DB ("3/3" -> n)
+    result["odd_even_dist"] = _stats_distribution(
+        analysis_draw_ids, LottoDrawStats.odd_count, LottoDrawStats.even_count
+    )
+    result["low_high_dist"] = _stats_distribution(
+        analysis_draw_ids, LottoDrawStats.low_count, LottoDrawStats.high_count
+    )
+    return result
+
+
 @main.route("/lotto-analyzer", methods=["GET", "POST"])
 def lotto_analyzer():
     message = None
@@ -77,129 +172,43 @@ def lotto_analyzer():
     if selected_window > 5000:
         selected_window = 5000
 
-    hot_numbers = []
-    cold_numbers = []
-    odd_even_dist = {}
-    low_high_dist = {}
-    top_pairs = []
-
-    analysis_draw_ids = []
+    analysis = _empty_analysis()
     if game:
-        analysis_draw_ids = [
-            x[0] for x in (
-                db.session.query(LottoDraw.id)
-                .filter(LottoDraw.game_id == game.id)
-                .order_by(LottoDraw.round_no.desc())
-                .limit(selected_window)
-                .all()
-            )
-        ]
-
-    if analysis_draw_ids:
-        # Hot numbers (top 10) from main numbers only (exclude bonus)
-        hot_numbers = (
-            db.session.query(
-                LottoDrawNumber.num.label("num"),
-                func.count(LottoDrawNumber.num).label("cnt"),
-            )
-            .filter(
-                LottoDrawNumber.draw_id.in_(analysis_draw_ids),
-                LottoDrawNumber.is_bonus.is_(False),
-            )
-            .group_by(LottoDrawNumber.num)
-            .order_by(func.count(LottoDrawNumber.num).desc(), LottoDrawNumber.num.asc())
-            .limit(10)
-            .all()
-        )
-
-        # Cold numbers (bottom 10)
-        cold_numbers = (
-            db.session.query(
-                LottoDrawNumber.num.label("num"),
-                func.count(LottoDrawNumber.num).label("cnt"),
-            )
-            .filter(
-                LottoDrawNumber.draw_id.in_(analysis_draw_ids),
-                LottoDrawNumber.is_bonus.is_(False),
-            )
-            .group_by(LottoDrawNumber.num)
-            .order_by(func.count(LottoDrawNumber.num).asc(), LottoDrawNumber.num.asc())
-            .limit(10)
-            .all()
+        # Cheap fingerprint of the game's draws; the heavy analysis is cached on it
+        last_round, draw_count = (
+            db.session.query(func.max(LottoDraw.round_no), func.count(LottoDraw.id))
+            .filter(LottoDraw.game_id == game.id)
+            .one()
         )
-                # Top Pairs (main numbers only, within selected window)
-        n1 = aliased(LottoDrawNumber)
-        n2 = aliased(LottoDrawNumber)
-
-        top_pairs = (
-            db.session.query(
-                n1.num.label("a"),
-                n2.num.label("b"),
-                func.count(func.distinct(n1.draw_id)).label("cnt"),
+        if draw_count:
+            analysis = _compute_lotto_analysis(
+                game.id, selected_window, last_round, draw_count
             )
-            .filter(
-                n1.draw_id.in_(analysis_draw_ids),
-                n2.draw_id.in_(analysis_draw_ids),
-                n1.draw_id == n2.draw_id,
-
-                n1.is_bonus.is_(False),
-                n2.is_bonus.is_(False),
-
-                # ensure pair is unique (a < b)
-                n1.num < n2.num,
-            )
-            .group_by(n1.num, n2.num)
-            .order_by(func.count(func.distinct(n1.draw_id)).desc(), n1.num.asc(), n2.num.asc())
-            .limit(20)
-            .all()
-        )
-
-        # Distributions from stats
-        stats_rows = (
-            db.session.query(LottoDrawStats)
-            .filter(LottoDrawStats.draw_id.in_(analysis_draw_ids))
-            .all()
-        )
-
-        for s in stats_rows:
-            k1 = f"{s.odd_count}/{s.even_count}"
-            odd_even_dist[k1] = odd_even_dist.get(k1, 0) + 1
-
-            k2 = f"{s.low_count}/{s.high_count}"
-            low_high_dist[k2] = low_high_dist.get(k2, 0) + 1
 
     draws = []
+    numbers_map = {}
+    bonus_map = {}
     if game:
-        draws = (
-            db.session.query(LottoDraw, LottoDrawStats)
-            .outerjoin(LottoDrawStats, LottoDrawStats.draw_id == LottoDraw.id)
+        # Latest 30 draws with stats (joined) and numbers (one IN query)
+        recent = (
+            db.session.query(LottoDraw)
+            .options(selectinload(LottoDraw.numbers), joinedload(LottoDraw.stats))
             .filter(LottoDraw.game_id == game.id)
             .order_by(LottoDraw.round_no.desc())
             .limit(30)
             .all()
         )
-
-    draw_ids = [d.id for d, _ in draws]
-    numbers_map = {did: [] for did in draw_ids}
-    bonus_map = {did: None for did in draw_ids}
-
-    if draw_ids:
-        rows = (
-            LottoDrawNumber.query
-            .filter(LottoDrawNumber.draw_id.in_(draw_ids))
-            .order_by(
-                LottoDrawNumber.draw_id.asc(),
-                LottoDrawNumber.is_bonus.asc(),
-                LottoDrawNumber.num.asc()
-            )
-            .all()
-        )
-
-        for r in rows:
-            if r.is_bonus:
-                bonus_map[r.draw_id] = r.num
-            else:
-                numbers_map[r.draw_id].append(r.num)
+        draws = [(d, d.stats) for d in recent]
+
+        for d in recent:
+            main_nums = []
+            bonus_map[d.id] = None
+            for n in d.numbers:
+                if n.is_bonus:
+                    bonus_map[d.id] = n.num
+                else:
+                    main_nums.append(n.num)
+            numbers_map[d.id] = sorted(main_nums)
 
     return render_template(
         "lotto/lotto_analyzer.html",
@@ -208,13 +217,13 @@ def lotto_analyzer():
         draws=draws,
         numbers_map=numbers_map,
         bonus_map=bonus_map,
-        top_pairs=top_pairs,
+        top_pairs=analysis["top_pairs"],
 
         selected_window=selected_window,
-        hot_numbers=hot_numbers,
-        cold_numbers=cold_numbers,
-        odd_even_dist=odd_even_dist,
-        low_high_dist=low_high_dist,
+        hot_numbers=analysis["hot_numbers"],
+        cold_numbers=analysis["cold_numbers"],
+        odd_even_dist=analysis["odd_even_dist"],
+        low_high_dist=analysis["low_high_dist"],
         generated_picks=generated_picks,
 
         page_title=get_page_title(),
@@ -3,26 +3,35 @@
 # Payments page (GET) + Payments create (POST)
 # Scoped to the logged-in user. Uses KRW/BDT-specific txn models.
 
+import re
 from datetime import date, datetime  # ✅ use class imports only (no 'import datetime' module)
 from flask import jsonify, render_template, request, redirect, url_for
-from sqlalchemy import func, asc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import case, func, asc, select, update
+from sqlalchemy.orm import lazyload, load_only, selectinload
 from flask_login import login_required, current_user
 from decimal import Decimal, InvalidOperation
 from uuid import uuid4
+from app.services.cache_versions import mark_changed
 from app.services.finance_score import get_finance_score
 from . import main
 from ..extensions import db
 from ..models import (
     AccountType,
-    Currency,
-    TransactionKRW,
-    TransactionBDT,
     TxnType,
     Category,
     Account,
+    TXN_MODEL_BY_CURRENCY,
 )
-from app.utils.helpers import get_page_title
+from app.utils.helpers import get_page_title, parse_money
+
+_CATEGORY_COLS = (Category.id, Category.name, Category.parent_id)
+_ACCOUNT_COLS = (
+    Account.id, Account.name, Account.type, Account.currency, Account.is_active,
+    Account.initial_balance, Account.credit_limit, Account.pending_total, Account.display_order,
+)
+
+# YYYY-M-D | M/D/YYYY, D/M/YYYY, D-M-YYYY
+_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})([/-])(\d{1,2})\5(\d{4})")
 
 
 # ---------------------------
@@ -34,18 +43,29 @@ def _parse_form_date(s: str) -> date:
     if not s:
         raise ValueError("Empty date")
 
-    # Most browsers send YYYY-MM-DD for <input type="date">
-    try:
-        return date.fromisoformat(s)
-    except ValueError:
-        pass
-
-    # Fallbacks
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d-%m-%Y", "%d/%m/%Y"):
+    # One match picks the shape: YYYY-MM-DD (what <input type="date"> sends),
+    # else NN/NN/YYYY or NN-NN-YYYY with the same separator twice.
+    m = _DATE_RE.fullmatch(s)
+    if m:
+        y, mo, d, a, sep, b, y2 = m.groups()
         try:
-            return datetime.strptime(s, fmt).date()
+            if y:
+                return date(int(y), int(mo), int(d))
+            if sep == "/":
+                # MM/DD/YYYY first, DD/MM/YYYY when the first part can't be a month
+                try:
+                    return date(int(y2), int(a), int(b))
+                except ValueError:
+                    return date(int(y2), int(b), int(a))
+            return date(int(y2), int(b), int(a))  # DD-MM-YYYY
         except ValueError:
-            continue
+            pass
+    else:
+        # Other ISO 8601 spellings (e.g. 20250131)
+        try:
+            return date.fromisoformat(s)
+        except ValueError:
+            pass
 
     raise ValueError(f"Unrecognized date: {s!r}")
 
@@ -61,25 +81,32 @@ def payments_page():
     tops = (
         db.session.query(Category)
         .filter(Category.user_id == current_user.id, Category.parent_id.is_(None))
-        .options(selectinload(Category.children))
+        .options(
+            # Only what the sidebar + cat_json use; children arrive name-ordered
+            load_only(*_CATEGORY_COLS),
+            lazyload(Category.parent),
+            selectinload(Category.children).options(
+                load_only(*_CATEGORY_COLS), lazyload(Category.parent)
+            ),
+        )
         .order_by(Category.name.asc())
         .all()
     )
 
-    # Accounts (ALL this user's — active + inactive)
-    accounts = (
-        db.session.query(Account)
-        .filter(Account.user_id == current_user.id)
+    # Accounts (ALL this user's — active + inactive), as plain rows: the page
+    # only reads these columns, no need for instrumented ORM objects
+    accounts = db.session.execute(
+        select(*_ACCOUNT_COLS)
+        .where(Account.user_id == current_user.id)
         .order_by(func.coalesce(Account.display_order, 10_000).asc(), Account.name.asc())
-        .all()
-    )
+    ).all()
 
     # JSON for right-side selects
     cat_json = [
         {
             "id": p.id,
             "name": p.name,
-            "children": [{"id": c.id, "name": c.name} for c in sorted(p.children, key=lambda x: x.name or "")],
+            "children": [{"id": c.id, "name": c.name} for c in p.children],
         }
         for p in tops
     ]
@@ -96,37 +123,10 @@ def payments_page():
             balances[a.id] = Decimal(a.initial_balance or 0)
             continue
 
-        # Credit: show available limit as the main number
+        # Credit: show available limit as the main number, pending from the
+        # maintained running total (positive number for display)
         balances[a.id] = Decimal(a.credit_limit or 0)
-
-        # Pending for credit cards (sum of pending expense/fee)
-        curr_code = getattr(a.currency, "value", str(a.currency))
-        if curr_code == "KRW":
-            pend = (
-                db.session.query(func.coalesce(func.sum(TransactionKRW.amount), 0))
-                .filter(
-                    TransactionKRW.user_id == current_user.id,
-                    TransactionKRW.account_id == a.id,
-                    TransactionKRW.is_pending.is_(True),
-                    TransactionKRW.is_deleted.is_(False),
-                    TransactionKRW.type.in_([TxnType.expense, TxnType.fee]),
-                )
-                .scalar()
-            )
-        else:
-            pend = (
-                db.session.query(func.coalesce(func.sum(TransactionBDT.amount), 0))
-                .filter(
-                    TransactionBDT.user_id == current_user.id,
-                    TransactionBDT.account_id == a.id,
-                    TransactionBDT.is_pending.is_(True),
-                    TransactionBDT.is_deleted.is_(False),
-                    TransactionBDT.type.in_([TxnType.expense, TxnType.fee]),
-                )
-                .scalar()
-            )
-        # Store pending as a positive number for display
-        pending_totals[a.id] = Decimal(-(pend or 0))
+        pending_totals[a.id] = Decimal(a.pending_total or 0)
 
     return render_template(
         "payments.html",
@@ -165,7 +165,7 @@ def payments_create():
 
     # amount (must be positive)
     try:
-        amount = Decimal(amt_str)
+        amount = parse_money(amt_str)
     except InvalidOperation:
         return redirect(url_for("main.payments_page", warning="Invalid amount"))
     if amount <= 0:
@@ -183,13 +183,23 @@ def payments_create():
     except Exception:
         return redirect(url_for("main.payments_page", warning="Invalid date"))
 
-    # account
-    account = db.session.get(Account, account_id)
-    if not account or account.user_id != current_user.id:
+    # account: ownership checked in the same SELECT, and the row stays locked
+    # until commit so concurrent POSTs can't both spend the same balance/limit
+    account = db.session.execute(
+        select(Account)
+        .where(Account.id == account_id, Account.user_id == current_user.id)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if not account:
         return redirect(url_for("main.payments_page", warning="Invalid account"))
     if not account.is_active:
         return redirect(url_for("main.payments_page", warning="This account is inactive. Edit and activate it first."))
 
+    # choose table by currency
+    txn_cls = TXN_MODEL_BY_CURRENCY.get(account.currency)
+    if txn_cls is None:
+        return redirect(url_for("main.payments_page", warning="Unsupported currency"))
+
     is_pending = False
 
     if account.type == AccountType.credit:
@@ -214,8 +224,6 @@ def payments_create():
             # If other types appear, treat as no-op on balance (or handle as needed)
             pass
 
-    # choose table by currency
-    txn_cls = TransactionKRW if account.currency == Currency.KRW else TransactionBDT
 
     # record history row (sign convention preserved)
     txn = txn_cls(
@@ -245,24 +253,34 @@ def accounts_set_limit():
 
     # Parse limit (>= 0) and round to cents
     try:
-        new_limit = Decimal(limit_str).quantize(Decimal("0.01"))
+        new_limit = parse_money(limit_str)
         if new_limit < 0:
             raise InvalidOperation
     except InvalidOperation:
         return redirect(url_for("main.payments_page", warning="Invalid limit"))
 
-    acc = db.session.get(Account, account_id)
-    if not acc or acc.user_id != current_user.id:
-        return redirect(url_for("main.payments_page", warning="Account not found"))
-
-    if acc.type != AccountType.credit:
+    # Overwrite AVAILABLE limit to the new value (does not change history).
+    # Ownership + type are checked by the UPDATE itself.
+    name = db.session.execute(
+        update(Account)
+        .where(
+            Account.id == account_id,
+            Account.user_id == current_user.id,
+            Account.type == AccountType.credit,
+        )
+        .values(credit_limit=new_limit)
+        .returning(Account.name)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    if name is None:
+        db.session.rollback()
+        acc = db.session.get(Account, account_id)
+        if not acc or acc.user_id != current_user.id:
+            return redirect(url_for("main.payments_page", warning="Account not found"))
         return redirect(url_for("main.payments_page", warning="Selected account is not a credit card"))
 
-    # Overwrite AVAILABLE limit to the new value (does not change history)
-    acc.credit_limit = new_limit
     db.session.commit()
-
-    return redirect(url_for("main.payments_page", success=f"Updated limit for {acc.name}"))
+    return redirect(url_for("main.payments_page", success=f"Updated limit for {name}"))
 
 
 # app/main/payments.py (add below payments_create)
@@ -277,7 +295,7 @@ def payments_settle():
 
     # Parse & validate amount
     try:
-        amount = Decimal(amt_str)
+        amount = parse_money(amt_str)
     except InvalidOperation:
         return redirect(url_for("main.payments_page", warning="Invalid amount"))
     if amount <= 0:
@@ -299,49 +317,46 @@ def payments_settle():
     if not pay.is_active:
         return redirect(url_for("main.payments_page", warning="Pay-from account is inactive"))
 
-    # Resolve txn class by currency
-    cls_card = TransactionKRW if card.currency == Currency.KRW else TransactionBDT
-    cls_pay  = TransactionKRW if pay.currency  == Currency.KRW  else TransactionBDT
-
-    # Sum total pending on the card (positive number)
-    pend_sum = (
-        db.session.query(func.coalesce(func.sum(cls_card.amount), 0))
-        .filter(
+    # Resolve txn class by currency (same for both sides, checked above)
+    cls_card = cls_pay = TXN_MODEL_BY_CURRENCY.get(card.currency)
+    if cls_card is None:
+        return redirect(url_for("main.payments_page", warning="Unsupported currency"))
+
+    # Pending txns FIFO (oldest first), locked for the settlement. The pending
+    # total is summed from these same rows, so there is no separate aggregate.
+    # Plain rows: the settled txns are only ever written back in bulk, so
+    # they never need to be ORM instances.
+    pending_txns = db.session.execute(
+        select(
+            cls_card.id, cls_card.amount, cls_card.date, cls_card.type,
+            cls_card.category_id, cls_card.note,
+        )
+        .where(
             cls_card.user_id == current_user.id,
             cls_card.account_id == card.id,
             cls_card.is_pending.is_(True),
             cls_card.is_deleted.is_(False),
             cls_card.type.in_([TxnType.expense, TxnType.fee]),
         )
-        .scalar()
-    )
+        .order_by(asc(cls_card.date), asc(cls_card.id))
+        .with_for_update()  # lock rows during settlement to avoid races
+    ).all()
+
     # expenses/fees are negative in storage; flip sign
-    pending_total = Decimal(-(pend_sum or 0))
+    pending_total = -sum((Decimal(t.amount or 0) for t in pending_txns), Decimal(0))
     if pending_total <= 0:
+        db.session.rollback()  # release the row locks
         return redirect(url_for("main.payments_page", warning="No pending transactions"))
     if amount > pending_total:
+        db.session.rollback()
         return redirect(url_for("main.payments_page", warning="Amount exceeds pending total"))
 
     # Check paying account live balance (you treat initial_balance as live)
     current_balance = Decimal(pay.initial_balance or 0)
     if amount > current_balance:
+        db.session.rollback()
         return redirect(url_for("main.payments_page", warning="Insufficient funds in paying account"))
 
-    # Fetch pending txns FIFO (oldest first)
-    pending_txns = (
-        db.session.query(cls_card)
-        .filter(
-            cls_card.user_id == current_user.id,
-            cls_card.account_id == card.id,
-            cls_card.is_pending.is_(True),
-            cls_card.is_deleted.is_(False),
-            cls_card.type.in_([TxnType.expense, TxnType.fee]),
-        )
-        .order_by(asc(cls_card.date), asc(cls_card.id))
-        .with_for_update()  # lock rows during settlement to avoid races
-        .all()
-    )
-
     gid = str(uuid4())
     remaining = amount
 
@@ -372,7 +387,11 @@ def payments_settle():
     # 3) Restore available limit
     card.credit_limit = (card.credit_limit or 0) + amount
 
-    # 4) Apply settlement to pending txns FIFO, allowing PARTIAL split on a single txn
+    # 4) Apply settlement to pending txns FIFO, allowing PARTIAL split on a single txn.
+    #    First classify the locked rows without writing anything: fully covered
+    #    rows go to paid_ids, at most one row is split. Then write in bulk.
+    paid_ids = []
+    partial = None  # (row, paid chunk)
     for t in pending_txns:
         if remaining <= 0:
             break
@@ -382,31 +401,52 @@ def payments_settle():
             continue
 
         if remaining >= txn_abs:
-            # fully cover this txn: mark it paid
-            t.is_pending = False
+            paid_ids.append(t.id)
             remaining -= txn_abs
         else:
-            # PARTIAL COVER: split this txn
-            # (a) insert a non-pending "paid portion" row mirroring the txn
-            paid_portion = cls_card(
-                user_id=current_user.id,
-                account_id=card.id,
-                date=t.date,
-                type=t.type,
-                amount=Decimal(-remaining),  # negative (expense)
-                category_id=getattr(t, "category_id", None),
-                note=(t.note or "") + " [partial paid]",
-                transfer_group_id=gid,
-                is_pending=False,
-            )
-            db.session.add(paid_portion)
-
-            # (b) reduce the original pending txn amount by the paid chunk
-            # original amount is negative; add the paid (positive) toward zero
-            t.amount = Decimal(t.amount) + Decimal(remaining)  # e.g., -100 + 30 => -70 remains pending
-            # keep is_pending=True
+            partial = (t, remaining)
             remaining = Decimal("0")
 
+    # (a) one UPDATE for every fully covered txn
+    if paid_ids:
+        db.session.execute(
+            update(cls_card)
+            .where(cls_card.id.in_(paid_ids))
+            .values(is_pending=False)
+            .execution_options(synchronize_session=False)
+        )
+
+    if partial:
+        t, chunk = partial
+        # (b) insert a non-pending "paid portion" row mirroring the txn
+        db.session.add(cls_card(
+            user_id=current_user.id,
+            account_id=card.id,
+            date=t.date,
+            type=t.type,
+            amount=-chunk,  # negative (expense)
+            category_id=t.category_id,
+            note=(t.note or "") + " [partial paid]",
+            transfer_group_id=gid,
+            is_pending=False,
+        ))
+
+        # (c) reduce the original pending txn amount by the paid chunk
+        # original amount is negative; add the paid (positive) toward zero
+        # e.g., -100 + 30 => -70 remains pending (keep is_pending=True)
+        db.session.execute(
+            update(cls_card)
+            .where(cls_card.id == t.id)
+            .values(amount=cls_card.amount + chunk)
+            .execution_options(synchronize_session=False)
+        )
+
+    # The UPDATEs above bypass the flush hooks: exactly `amount` left the
+    # card's pending_total (services/card_pending.py), and cached views of
+    # this user's transactions must be invalidated (services/cache_versions.py).
+    card.pending_total = Account.pending_total - amount
+    mark_changed(db.session, "txn", current_user.id)
+
     db.session.commit()
 
     # Craft feedback
@@ -424,23 +464,28 @@ def accounts_set_balance_exact():
     if not acc_id or target_str == "":
         return redirect(url_for("main.payments_page", warning="Missing fields"))
 
-    from decimal import Decimal, InvalidOperation
     try:
-        target = Decimal(target_str).quantize(Decimal("0.01"))
+        target = parse_money(target_str)
     except InvalidOperation:
         return redirect(url_for("main.payments_page", warning="Invalid amount"))
 
-    acc = db.session.get(Account, acc_id)
-    if not acc or acc.user_id != current_user.id:
+    # Credit cards: this sets AVAILABLE limit right now.
+    # Non-credit: this is your **live balance**. No transaction math.
+    is_credit = Account.type == AccountType.credit
+    found = db.session.execute(
+        update(Account)
+        .where(Account.id == acc_id, Account.user_id == current_user.id)
+        .values(
+            credit_limit=case((is_credit, target), else_=Account.credit_limit),
+            initial_balance=case((is_credit, Account.initial_balance), else_=target),
+        )
+        .returning(Account.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if found is None:
+        db.session.rollback()
         return redirect(url_for("main.payments_page", warning="Account not found"))
 
-    if acc.type == AccountType.credit:
-        # Credit cards: this sets AVAILABLE limit right now
-        acc.credit_limit = target
-    else:
-        # Non-credit: this is your **live balance**. No transaction math.
-        acc.initial_balance = target
-
     db.session.commit()
     return redirect(url_for("main.payments_page", success="Balance updated"))
 
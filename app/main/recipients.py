@@ -2,6 +2,7 @@
 from flask import request, redirect, url_for, jsonify
 from flask_login import login_required, current_user
 from decimal import Decimal
+from sqlalchemy import exists, or_
 from ..extensions import db
 from ..main import main
 from ..models import Recipient, Method, RecipientType, TransactionKRW, TransactionBDT
@@ -10,17 +11,18 @@ def _get_recipient_owned(rid: int):
     r = db.session.get(Recipient, rid)
     return r if (r and r.user_id == current_user.id) else None
 
-def _recipient_usage_count(rid: int) -> int:
-    # how many txns reference this recipient in both ledgers
-    c1 = db.session.query(TransactionKRW).filter(
+def _recipient_in_use(rid: int) -> bool:
+    # does any txn in either ledger reference this recipient? EXISTS stops at
+    # the first hit (served by ix_t_krw/bdt_user_recipient_date)
+    in_krw = exists().where(
         TransactionKRW.user_id == current_user.id,
         TransactionKRW.recipient_id == rid
-    ).count()
-    c2 = db.session.query(TransactionBDT).filter(
+    )
+    in_bdt = exists().where(
         TransactionBDT.user_id == current_user.id,
         TransactionBDT.recipient_id == rid
-    ).count()
-    return c1 + c2
+    )
+    return bool(db.session.query(or_(in_krw, in_bdt)).scalar())
 
 @main.route("/recipients/new", methods=["POST"], endpoint="recipients_create")
 @login_required
@@ -86,27 +88,37 @@ def recipients_update(rid):
     # enums with safe fallbacks
     type_str = (request.form.get("type") or "person").strip()
     try:
-        r.type = RecipientType(type_str if type_str != "self" else "self_")
+        rtype = RecipientType(type_str if type_str != "self" else "self_")
     except Exception:
-        r.type = RecipientType.person
+        rtype = RecipientType.person
 
     method_str = (request.form.get("default_method") or "").strip() or None
     try:
-        r.default_method = Method(method_str) if method_str else None
+        dmethod = Method(method_str) if method_str else None
     except Exception:
-        r.default_method = None
-
-    r.name = name
-    r.country = (request.form.get("country") or "").strip() or None
-    r.default_service_name = (request.form.get("default_service_name") or "").strip() or None
-    r.default_account_no_masked = (request.form.get("default_account_no_masked") or "").strip() or None
-    r.notes = (request.form.get("notes") or "").strip() or None
-    r.is_favorite = bool(request.form.get("is_favorite"))
-
-    db.session.commit()
+        dmethod = None
 
+    fields = {
+        "type": rtype,
+        "default_method": dmethod,
+        "name": name,
+        "country": (request.form.get("country") or "").strip() or None,
+        "default_service_name": (request.form.get("default_service_name") or "").strip() or None,
+        "default_account_no_masked": (request.form.get("default_account_no_masked") or "").strip() or None,
+        "notes": (request.form.get("notes") or "").strip() or None,
+        "is_favorite": bool(request.form.get("is_favorite")),
+    }
+    # Only write (and commit) what actually changed; idempotent saves are read-only
+    changed = {k: v for k, v in fields.items() if getattr(r, k) != v}
+    if changed:
+        for k, v in changed.items():
+            setattr(r, k, v)
+        db.session.commit()
+
+    # Reply from the form values: no post-commit refresh SELECT of r
+    acct = fields["default_account_no_masked"]
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
-        return jsonify(ok=True, id=r.id, name=r.name, acct=r.default_account_no_masked or "")
+        return jsonify(ok=True, id=rid, name=name, acct=acct or "")
     return redirect(url_for("main.transfers_page", success="Recipient updated"))
 
 @main.route("/recipients/<int:rid>/delete", methods=["POST"], endpoint="recipients_delete")
@@ -118,8 +130,7 @@ def recipients_delete(rid):
             return jsonify(ok=False, error="Recipient not found"), 404
         return redirect(url_for("main.transfers_page", warning="Recipient not found"))
 
-    used = _recipient_usage_count(rid)
-    if used > 0:
+    if _recipient_in_use(rid):
         msg = "Cannot delete: recipient is used in transactions."
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return jsonify(ok=False, error=msg), 400
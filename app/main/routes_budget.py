@@ -1,18 +1,37 @@
 # routes_budget.py
-from datetime import date
+from datetime import date, datetime, timezone
 from decimal import Decimal, InvalidOperation
 
-from flask import request, render_template, redirect, url_for
+from flask import jsonify, request, render_template, redirect, url_for
 from flask_login import login_required, current_user
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from ..main import main
-from ..extensions import db
+from ..extensions import db, cache
 from ..models import Budget, BudgetType, Category, TxnType
-from ..services.budgeting import compute_budget_page, month_income_total
+from ..services.budgeting import compute_budget_page, compute_year_lines, month_income_total
+from ..services.cache_versions import data_version, mark_changed
+from ..utils.helpers import parse_money
 
 
-TYPE_ROW_ID = "type:transfer_international"  # must match services
-TYPE_ENUM   = TxnType.transfer_international
+def _posted_amount(val: str | None) -> Decimal | None:
+    """A posted budget amount: None for blank (clear), else cents; raises InvalidOperation."""
+    val = (val or "").strip()
+    return None if val == "" else parse_money(val)
+
+
+def _parent_category_ids(user_id: int) -> frozenset[int]:
+    """The user's top-level categories (the only ones that carry budgets)."""
+    return _parent_category_ids_cached(user_id, data_version("category", user_id))
+
+
+@cache.memoize(timeout=3600)
+def _parent_category_ids_cached(user_id: int, version: str) -> frozenset[int]:
+    return frozenset(db.session.execute(
+        select(Category.id).where(Category.user_id == user_id, Category.parent_id.is_(None))
+    ).scalars())
 
 
 @main.route("/budget", methods=["GET"], endpoint="budget_page")
@@ -25,74 +44,34 @@ def budget_page():
     # Force KRW per requirement (we ignore any ?currency=)
     currency = "KRW"
 
-    # Build data (includes the type pseudo-row)
+    # Build data (includes the type pseudo-row and the previous-month fallback)
     data = compute_budget_page(current_user.id, currency, year, month)
     income_total_val = month_income_total(current_user.id, currency, year, month)
 
-    # ---------- Fallback injection from previous month (categories + type) ----------
-    # Do we have any budgets (either category or type) this month?
-    have_any_curr = (
-        db.session.query(Budget.id)
-        .filter(Budget.user_id == current_user.id, Budget.year == year, Budget.month == month)
-        .first() is not None
-    ) or (
-        db.session.query(BudgetType.id)
-        .filter(BudgetType.user_id == current_user.id, BudgetType.year == year, BudgetType.month == month)
-        .first() is not None
-    )
-
-    data["used_fallback"] = False
-    if not have_any_curr:
-        prev_y, prev_m = (year - 1, 12) if month == 1 else (year, month - 1)
-
-        # map of previous month parent-category budgets
-        prev_cat_map = {
-            cid: amt
-            for cid, amt in db.session.query(Budget.category_id, Budget.amount)
-            .filter(Budget.user_id == current_user.id,
-                    Budget.year == prev_y, Budget.month == prev_m)
-            .all()
-            if cid is not None
-        }
-
-        # previous month type budget for transfer_international
-        prev_type_amt = (db.session.query(BudgetType.amount)
-                         .filter(BudgetType.user_id == current_user.id,
-                                 BudgetType.year == prev_y, BudgetType.month == prev_m,
-                                 BudgetType.txn_type == TYPE_ENUM)
-                         .scalar())
-
-        # Inject into current data.table (do not overwrite non-zero values)
-        for row in (data.get("table") or []):
-            rid = row.get("id")
-            if rid == TYPE_ROW_ID:
-                if (row.get("budget") in (None, 0, "0", "")) and prev_type_amt:
-                    row["budget"] = float(prev_type_amt or 0)
-            else:
-                if (row.get("budget") in (None, 0, "0", "")) and (rid in prev_cat_map):
-                    row["budget"] = float(prev_cat_map[rid])
-
-        data["used_fallback"] = bool(prev_cat_map or prev_type_amt)
-    # -----------------------------------------------------------------------------
-
-    # Yearly lines (KRW-only)
-    line_labels = [f"{m:02d}" for m in range(1, 13)]
-    line_budget, line_spent = [], []
-    for m in range(1, 13):
-        d = compute_budget_page(current_user.id, currency, year, m)
-        line_budget.append(d["totals"]["budget"])
-        line_spent.append(d["totals"]["spent"])
-
+    # The yearly chart is fetched by the page from budget_yearly_json
     return render_template(
         "budget.html",
         page_title="Budget",
         year=year, month=month, currency=currency,
         data=data,
-        line_chart={"labels": line_labels, "budget": line_budget, "spent": line_spent},
         income_total=float(income_total_val),
     )
 
 
+@main.route("/budget/yearly.json", methods=["GET"], endpoint="budget_yearly_json")
+@login_required
+def budget_yearly_json():
+    year = request.args.get("year", type=int) or date.today().year
+
+    # Yearly lines (KRW-only)
+    lines = compute_year_lines(current_user.id, "KRW", year)
+    return jsonify({
+        "labels": [f"{m:02d}" for m in range(1, 13)],
+        "budget": lines["budget"],
+        "spent": lines["spent"],
+    })
+
+
 @main.route("/budget/set", methods=["POST"], endpoint="budget_set")
 @login_required
 def budget_set():
@@ -100,79 +79,87 @@ def budget_set():
     month = request.form.get("month", type=int)
     currency = "KRW"  # forced
 
-    # ----- 1) Save category budgets (parents only) -----
-    parent_ids = {
-        cid for (cid,) in db.session.query(Category.id)
-        .filter(Category.user_id == current_user.id, Category.parent_id.is_(None))
-        .all()
-    }
-
-    posted_cat = {k: v for k, v in request.form.items() if k.startswith("budget[")}
-    for key, val in posted_cat.items():
-        # key is like budget[<id>]
-        cid_raw = key[7:-1]
-        try:
-            cid = int(cid_raw)
-        except ValueError:
-            continue
-        if cid not in parent_ids:
-            continue
-
-        val = (val or "").strip()
-        if val == "":
-            (Budget.query
-                .filter_by(user_id=current_user.id, category_id=cid, year=year, month=month)
-                .delete(synchronize_session=False))
-            continue
+    uid = current_user.id
+    parent_ids = _parent_category_ids(uid)
 
+    # ----- 1) Collect posted values -----
+    # Parallel lists: cat_ids[] / cat_amts[] and type_keys[] / type_amts[]
+    # (<TxnType name>); "" clears, bad numbers are ignored. Only parent
+    # categories carry budgets, so other ids are dropped before parsing.
+    cat_updates: dict[int, Decimal | None] = {}
+    for ident, val in zip(request.form.getlist("cat_ids[]"), request.form.getlist("cat_amts[]")):
         try:
-            amt = Decimal(val)
-        except InvalidOperation:
+            cid = int(ident)
+            if cid in parent_ids:
+                cat_updates[cid] = _posted_amount(val)
+        except (ValueError, InvalidOperation):
             continue
 
-        row = (Budget.query
-               .filter_by(user_id=current_user.id, category_id=cid, year=year, month=month)
-               .first())
-        if row:
-            row.amount = amt
-        else:
-            db.session.add(Budget(
-                user_id=current_user.id, category_id=cid,
-                year=year, month=month, amount=amt
-            ))
-
-    # ----- 2) Save type budgets (transfer_international) -----
-    # Expect an input named: budget_type[transfer_international]
-    posted_type = {k: v for k, v in request.form.items() if k.startswith("budget_type[")}
-    for key, val in posted_type.items():
-        tname = key[len("budget_type["):-1]  # "transfer_international"
-        try:
-            t_enum = TxnType[tname]
-        except KeyError:
-            continue
-
-        val = (val or "").strip()
-        if val == "":
-            (BudgetType.query
-                .filter_by(user_id=current_user.id, year=year, month=month, txn_type=t_enum)
-                .delete(synchronize_session=False))
+    type_updates: dict[TxnType, Decimal | None] = {}
+    for ident, val in zip(request.form.getlist("type_keys[]"), request.form.getlist("type_amts[]")):
+        t_enum = TxnType.__members__.get(ident)
+        if t_enum is None:
             continue
-
         try:
-            amt = Decimal(val)
+            type_updates[t_enum] = _posted_amount(val)
         except InvalidOperation:
             continue
 
-        row = (BudgetType.query
-               .filter_by(user_id=current_user.id, year=year, month=month, txn_type=t_enum)
-               .first())
-        if row:
-            row.amount = amt
+    # ----- 2) Save category budgets -----
+    insert = pg_insert if db.session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    # One clock for both upserts: Budget.updated_at is naive UTC, BudgetType.updated_at is aware
+    now = datetime.now(timezone.utc)
+
+    # One DELETE for cleared rows, one INSERT .. ON CONFLICT DO UPDATE for the rest.
+    # The upserts run as executemany (rows passed as parameters, not .values()),
+    # so the compiled statement is the same whatever the row count and is
+    # served from the engine's compiled-statement cache. The modal posts every
+    # row on each save, so conflicting rows are only rewritten when the amount
+    # actually changed (no dead tuples / updated_at churn for untouched rows).
+    cleared, rows = [], []
+    for cid, amt in cat_updates.items():
+        if amt is None:
+            cleared.append(cid)
         else:
-            db.session.add(BudgetType(
-                user_id=current_user.id, year=year, month=month, txn_type=t_enum, amount=amt
-            ))
-
+            rows.append({"user_id": uid, "category_id": cid, "year": year, "month": month, "amount": amt})
+    if cleared:
+        db.session.execute(
+            delete(Budget).where(
+                Budget.user_id == uid, Budget.year == year, Budget.month == month,
+                Budget.category_id.in_(cleared),
+            )
+        )
+    if rows:
+        stmt = insert(Budget)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[Budget.user_id, Budget.year, Budget.month, Budget.category_id],
+            set_={"amount": stmt.excluded.amount, "updated_at": now.replace(tzinfo=None)},
+            where=Budget.amount != stmt.excluded.amount,
+        ), rows)
+
+    # ----- 3) Save type budgets (transfer_international) -----
+    cleared, rows = [], []
+    for t, amt in type_updates.items():
+        if amt is None:
+            cleared.append(t)
+        else:
+            rows.append({"user_id": uid, "year": year, "month": month, "txn_type": t, "amount": amt})
+    if cleared:
+        db.session.execute(
+            delete(BudgetType).where(
+                BudgetType.user_id == uid, BudgetType.year == year, BudgetType.month == month,
+                BudgetType.txn_type.in_(cleared),
+            )
+        )
+    if rows:
+        stmt = insert(BudgetType)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[BudgetType.user_id, BudgetType.year, BudgetType.month, BudgetType.txn_type],
+            set_={"amount": stmt.excluded.amount, "updated_at": now},
+            where=BudgetType.amount != stmt.excluded.amount,
+        ), rows)
+
+    mark_changed(db.session, "budget", uid)  # Core writes: not seen by the flush hook
     db.session.commit()
     return redirect(url_for("main.budget_page", year=year, month=month, currency=currency, success="Budgets saved"))
 
@@ -191,5 +178,6 @@ def budget_reset():
         .filter_by(user_id=current_user.id, year=year, month=month)
         .delete(synchronize_session=False))
 
+    mark_changed(db.session, "budget", current_user.id)  # bulk deletes skip the flush hook
     db.session.commit()
     return redirect(url_for("main.budget_page", year=year, month=month, currency=currency, success="Budgets cleared"))
@@ -1,42 +1,64 @@
 # routes_recurring.py (or inside your existing blueprint file)
 from ..main import main
 from datetime import date
-from decimal import Decimal, InvalidOperation
-from flask import request, redirect, url_for, render_template
+from decimal import InvalidOperation
+from flask import current_app, request, redirect, url_for, render_template
 from flask_login import login_required, current_user
 from collections import defaultdict
+from sqlalchemy import Text, cast, delete, not_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import lazyload, load_only
 from ..models import Category  # adjust import path
 
-from ..extensions import db
+from ..extensions import db, cache
 from ..models import Account, TxnType, RecurringRule, RecurringFrequency
+from ..services.cache_versions import data_version
 from ..services.recurring import run_due_rules_for_user
+from ..utils.helpers import parse_money
+
+
 def _category_options_breadcrumb(user_id: int):
     """Return list of dicts: {'id': int, 'path': 'Parent / Child / Subchild'}."""
-    cats = Category.query.filter_by(user_id=user_id).all()
-    by_id = {c.id: c for c in cats}
-
-    def path(c):
-        parts = []
-        cur = c
-        # assuming Category has parent_id; adjust if your field differs
-        while cur:
-            parts.append(cur.name)
-            cur = by_id.get(cur.parent_id) if getattr(cur, "parent_id", None) else None
-        return " / ".join(reversed(parts))
-
-    out = [{"id": c.id, "path": path(c)} for c in cats]
-    # Sort by breadcrumb for nicer UX
+    return _category_breadcrumbs_cached(user_id, data_version("category", user_id))
+
+
+@cache.memoize(timeout=3600)
+def _category_breadcrumbs_cached(user_id: int, version: str):
+    # Paths are built by the database: roots, then children joined level by level
+    tree = (
+        select(Category.id, cast(Category.name, Text).label("path"))
+        .where(Category.user_id == user_id, Category.parent_id.is_(None))
+        .cte("category_paths", recursive=True)
+    )
+    tree = tree.union_all(
+        select(Category.id, tree.c.path + " / " + Category.name)
+        .join(tree, Category.parent_id == tree.c.id)
+        .where(Category.user_id == user_id)
+    )
+
+    out = [{"id": cid, "path": path} for cid, path in db.session.execute(select(tree.c.id, tree.c.path))]
+    # Sort by breadcrumb for nicer UX (in Python: same order whatever the DB collation)
     out.sort(key=lambda x: x["path"].lower())
     return out
+
+
 @main.route("/recurring", methods=["GET"], endpoint="recurring_page")
 @login_required
 def recurring_page():
+    # All of the user's accounts first (only the columns the page shows): the
+    # active ones fill the form, and every rule's r.account then resolves from
+    # the identity map, so the rules query needs no JOIN to accounts.
+    user_accounts = (Account.query
+                     .options(load_only(Account.id, Account.name, Account.currency, Account.is_active))
+                     .filter_by(user_id=current_user.id)
+                     .all())
+    accounts = [a for a in user_accounts if a.is_active]
     rules = (RecurringRule.query
+             .options(lazyload(RecurringRule.account))
              .filter_by(user_id=current_user.id)
              .order_by(RecurringRule.is_enabled.desc(), RecurringRule.next_run.asc())
              .all())
-    accounts = Account.query.filter_by(user_id=current_user.id, is_active=True).all()
-    categories = _category_options_breadcrumb(current_user.id)
+    categories = _category_options_breadcrumb(current_user.id)  # cached
     return render_template(
         "recurring.html",
         page_title="Recurring Payments",
@@ -48,97 +70,110 @@ def recurring_page():
 @main.route("/recurring/new", methods=["POST"], endpoint="recurring_create")
 @login_required
 def recurring_create():
-    try:
-        account_id = request.form.get("account_id", type=int)
-        ttype_str  = request.form.get("type", "expense")
-        amount_str = (request.form.get("amount") or "").strip()
-        category_id = request.form.get("category_id", type=int)
-        note = (request.form.get("note") or "").strip()
-
-        freq_str   = request.form.get("frequency", "monthly")
-        every_n    = request.form.get("every_n", type=int) or 1
-        start_str  = request.form.get("start_date")
-        end_str    = request.form.get("end_date")  # optional
-        weekday    = request.form.get("weekday", type=int)  # optional 0..6
-        dom        = request.form.get("day_of_month", type=int)  # optional 1..31
-
-        if not account_id or not amount_str or not start_str:
-            return redirect(url_for("main.recurring_page", warning="Missing required fields"))
+    account_id = request.form.get("account_id", type=int)
+    ttype_str  = request.form.get("type", "expense")
+    amount_str = (request.form.get("amount") or "").strip()
+    category_id = request.form.get("category_id", type=int)
+    note = (request.form.get("note") or "").strip()
+
+    freq_str   = request.form.get("frequency", "monthly")
+    every_n    = request.form.get("every_n", type=int) or 1
+    start_str  = request.form.get("start_date")
+    end_str    = request.form.get("end_date")  # optional
+    weekday    = request.form.get("weekday", type=int)  # optional 0..6
+    dom        = request.form.get("day_of_month", type=int)  # optional 1..31
+
+    # Validate everything before touching the session: bad input never
+    # needs a rollback
+    if not account_id or not amount_str or not start_str:
+        return redirect(url_for("main.recurring_page", warning="Missing required fields"))
 
-        try:
-            amount = Decimal(amount_str)
-        except InvalidOperation:
-            return redirect(url_for("main.recurring_page", warning="Invalid amount"))
-        if amount <= 0:
-            return redirect(url_for("main.recurring_page", warning="Amount must be > 0"))
-
-        try:
-            ttype = TxnType(ttype_str)
-        except ValueError:
-            return redirect(url_for("main.recurring_page", warning="Invalid transaction type"))
-
-        try:
-            start_date = date.fromisoformat(start_str)
-        except Exception:
-            return redirect(url_for("main.recurring_page", warning="Invalid start date"))
+    try:
+        amount = parse_money(amount_str)  # rejects NaN / Infinity
+    except InvalidOperation:
+        return redirect(url_for("main.recurring_page", warning="Invalid amount"))
+    if amount <= 0:
+        return redirect(url_for("main.recurring_page", warning="Amount must be > 0"))
 
-        end_date = None
-        if end_str:
-            try:
-                end_date = date.fromisoformat(end_str)
-            except Exception:
-                return redirect(url_for("main.recurring_page", warning="Invalid end date"))
+    try:
+        ttype = TxnType(ttype_str)
+    except ValueError:
+        return redirect(url_for("main.recurring_page", warning="Invalid transaction type"))
 
-        account = db.session.get(Account, account_id)
-        if not account or account.user_id != current_user.id:
-            return redirect(url_for("main.recurring_page", warning="Invalid account"))
+    try:
+        start_date = date.fromisoformat(start_str)
+    except ValueError:
+        return redirect(url_for("main.recurring_page", warning="Invalid start date"))
 
+    end_date = None
+    if end_str:
         try:
-            freq = RecurringFrequency(freq_str)
+            end_date = date.fromisoformat(end_str)
         except ValueError:
-            return redirect(url_for("main.recurring_page", warning="Invalid frequency"))
-
-        rule = RecurringRule(
-            user_id=current_user.id,
-            account_id=account.id,
-            type=ttype,
-            amount=amount,
-            category_id=category_id,
-            note=note,
-
-            frequency=freq,
-            every_n=every_n,
-            start_date=start_date,
-            next_run=start_date,
-            end_date=end_date,
-            weekday=weekday if freq == RecurringFrequency.weekly else None,
-            day_of_month=dom if freq == RecurringFrequency.monthly else None,
-            is_enabled=True,
-        )
+            return redirect(url_for("main.recurring_page", warning="Invalid end date"))
+
+    try:
+        freq = RecurringFrequency(freq_str)
+    except ValueError:
+        return redirect(url_for("main.recurring_page", warning="Invalid frequency"))
+
+    account = db.session.get(Account, account_id)
+    if not account or account.user_id != current_user.id:
+        return redirect(url_for("main.recurring_page", warning="Invalid account"))
+
+    rule = RecurringRule(
+        user_id=current_user.id,
+        account_id=account.id,
+        type=ttype,
+        amount=amount,
+        category_id=category_id,
+        note=note,
+
+        frequency=freq,
+        every_n=every_n,
+        start_date=start_date,
+        next_run=start_date,
+        end_date=end_date,
+        weekday=weekday if freq == RecurringFrequency.weekly else None,
+        day_of_month=dom if freq == RecurringFrequency.monthly else None,
+        is_enabled=True,
+    )
+    try:
         db.session.add(rule)
         db.session.commit()
-        return redirect(url_for("main.recurring_page", success="Recurring rule created"))
-    except Exception as e:
+    except SQLAlchemyError:
         db.session.rollback()
+        current_app.logger.exception("[recurring] create failed for user=%s", current_user.id)
         return redirect(url_for("main.recurring_page", warning="Failed to create"))
+    return redirect(url_for("main.recurring_page", success="Recurring rule created"))
 
 @main.route("/recurring/<int:rid>/toggle", methods=["POST"], endpoint="recurring_toggle")
 @login_required
 def recurring_toggle(rid):
-    rule = db.session.get(RecurringRule, rid)
-    if not rule or rule.user_id != current_user.id:
+    # Ownership check + flip in one statement; no row -> not found / not ours
+    res = db.session.execute(
+        update(RecurringRule)
+        .where(RecurringRule.id == rid, RecurringRule.user_id == current_user.id)
+        .values(is_enabled=not_(RecurringRule.is_enabled))
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.session.rollback()
         return redirect(url_for("main.recurring_page", warning="Rule not found"))
-    rule.is_enabled = not bool(rule.is_enabled)
     db.session.commit()
     return redirect(url_for("main.recurring_page", success="Updated"))
 
 @main.route("/recurring/<int:rid>/delete", methods=["POST"], endpoint="recurring_delete")
 @login_required
 def recurring_delete(rid):
-    rule = db.session.get(RecurringRule, rid)
-    if not rule or rule.user_id != current_user.id:
+    res = db.session.execute(
+        delete(RecurringRule)
+        .where(RecurringRule.id == rid, RecurringRule.user_id == current_user.id)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        db.session.rollback()
         return redirect(url_for("main.recurring_page", warning="Rule not found"))
-    db.session.delete(rule)
     db.session.commit()
     return redirect(url_for("main.recurring_page", success="Deleted"))
 
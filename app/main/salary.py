@@ -3,7 +3,9 @@ from datetime import date, datetime, time, timedelta
 from decimal import Decimal
 from flask import render_template, request, redirect, url_for,jsonify
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import (
+    Integer, and_, bindparam, case, cast, delete, distinct, exists, extract, func, not_, or_, select, update,
+)
 from ..extensions import db
 from ..models import SalarySettings, WorkLog, Holiday, SalaryAdjust
 from . import main
@@ -11,6 +13,7 @@ from app.utils.helpers import get_page_title
 import calendar
 import os
 import tempfile
+from collections import defaultdict
 from flask import send_file, request
 from . import main
 from app.utils.payslip_pdf import draw_payslip_page, draw_logs_page
@@ -19,14 +22,7 @@ from reportlab.pdfgen import canvas
 import os, tempfile, calendar
 
 PAID_LEAVE_YEARLY_LIMIT = 16
-
-
-def is_paid_leave(log) -> bool:
-    return (
-        log
-        and log.is_full_day_leave
-        and (getattr(log, "leave_type", "unpaid") or "unpaid") == "paid"
-    )
+_SIXTY = Decimal(60)  # minutes per hour
 
 
 def count_paid_leave_days_for_year(user_id: int, year: int) -> int:
@@ -98,7 +94,7 @@ def fmt_krw(v: Decimal) -> str:
 
 
 def fmt_hours_from_minutes(mins: int) -> str:
-    h = Decimal(mins) / Decimal(60)
+    h = Decimal(mins) / _SIXTY
     # show 0.0, 1.5, 12.0 style
     return f"{h:.1f}"
 
@@ -131,15 +127,28 @@ def month_bounds(year: int, month: int):
 def month_start(d: date) -> date:
     return date(d.year, d.month, 1)
 
+# Built once and executed with bind params: the settings row in force on a day
+_SETTINGS_AS_OF = (
+    select(SalarySettings)
+    .where(SalarySettings.user_id == bindparam("uid"),
+           SalarySettings.effective_from <= bindparam("as_of"))
+    .order_by(SalarySettings.effective_from.desc(), SalarySettings.id.desc())
+    .limit(1)
+)
+
+# SELECT EXISTS(...): stops at the first match instead of counting
+_HOLIDAY_EXISTS = select(
+    exists().where(Holiday.user_id == bindparam("uid"), Holiday.holiday_date == bindparam("d"))
+)
+
+
+def _settings_as_of(user_id: int, as_of: date) -> SalarySettings | None:
+    return db.session.execute(_SETTINGS_AS_OF, {"uid": user_id, "as_of": as_of}).scalar_one_or_none()
+
+
 def get_current_settings(user_id: int) -> SalarySettings:
     today = month_start(date.today())
-    s = (
-        SalarySettings.query
-        .filter(SalarySettings.user_id == user_id,
-                SalarySettings.effective_from <= today)
-        .order_by(SalarySettings.effective_from.desc(), SalarySettings.id.desc())
-        .first()
-    )
+    s = _settings_as_of(user_id, today)
     if not s:
         s = SalarySettings(user_id=user_id, effective_from=today)
         db.session.add(s)
@@ -148,13 +157,7 @@ def get_current_settings(user_id: int) -> SalarySettings:
 
 def get_settings_for_month(user_id: int, year: int, month: int) -> SalarySettings:
     target = date(year, month, 1)
-    s = (
-        SalarySettings.query
-        .filter(SalarySettings.user_id == user_id,
-                SalarySettings.effective_from <= target)
-        .order_by(SalarySettings.effective_from.desc(), SalarySettings.id.desc())
-        .first()
-    )
+    s = _settings_as_of(user_id, target)
     if not s:
         # fallback: create default effective from target month start
         s = SalarySettings(user_id=user_id, effective_from=target)
@@ -168,19 +171,14 @@ def is_weekend(d: date) -> bool:
 
 
 def is_holiday(user_id: int, d: date) -> bool:
-    return (
-        db.session.query(func.count(Holiday.id))
-        .filter(Holiday.user_id == user_id, Holiday.holiday_date == d)
-        .scalar()
-        > 0
-    )
+    return db.session.execute(_HOLIDAY_EXISTS, {"uid": user_id, "d": d}).scalar()
 
 
-def week_start_monday(d: date) -> date:
-    return d - timedelta(days=d.weekday())
+# ---------- work minutes calc ----------
+def _regular_cap(s: SalarySettings) -> int:
+    return int(Decimal(s.hours_per_day) * 60)  # 8h -> 480 mins
 
 
-# ---------- work minutes calc ----------
 def compute_minutes_for_day(user_id: int, s: SalarySettings, d: date, in_t, out_t, lunch_min: int, full_leave: bool):
     """
     Your rules:
@@ -213,129 +211,99 @@ def compute_minutes_for_day(user_id: int, s: SalarySettings, d: date, in_t, out_
         return total_minutes, 0, total_minutes
 
     # weekday: 8h regular cap
-    regular_cap = int(Decimal(s.hours_per_day) * 60)  # 8h -> 480 mins
+    regular_cap = _regular_cap(s)
     regular_minutes = min(total_minutes, regular_cap)
     overtime_minutes = max(0, total_minutes - regular_minutes)
     return total_minutes, regular_minutes, overtime_minutes
 
 
 # ---------- monthly summary ----------
-def calc_month_summary(user_id: int, year: int, month: int):
-    s = get_settings_for_month(user_id, year, month)
-    start, end = month_bounds(year, month)
+_NO_LOG_TOTALS = (0, 0, 0, 0, 0, 0, 0)
 
-    logs = (
-        WorkLog.query
+
+def _log_totals_by_month(user_id: int, start: date, end: date, regular_caps: dict[int, int]) -> dict:
+    """
+    Per-month log totals for [start, end) in one aggregate query (no rows
+    loaded); regular_caps maps month -> weekday regular minutes (8h -> 480).
+    Months without logs are missing. For each month:
+    - weekend/holiday: days/minutes actually worked (paid at OT rate)
+    - weekday full-day leave: paid annual leave days; unpaid leave days and
+      the weeks they fall in (one penalty day per week)
+      (paid annual leave does NOT create deduction or penalty)
+    - other weekdays: overtime, and short minutes below the 8h cap
+      (only when a time entry exists; otherwise we don't assume anything)
+    """
+    month_no = cast(extract("month", WorkLog.work_date), Integer)
+    dow = cast(extract("dow", WorkLog.work_date), Integer)  # 0=Sun .. 6=Sat
+    off_day = or_(
+        dow.in_((0, 6)),
+        exists().where(Holiday.user_id == user_id, Holiday.holiday_date == WorkLog.work_date),
+    )
+    workday = not_(off_day)
+    worked = WorkLog.worked_minutes
+    regular_cap = case(regular_caps, value=month_no)
+    leave = WorkLog.is_full_day_leave.is_(True)
+    not_leave = WorkLog.is_full_day_leave.is_(False)
+    paid = WorkLog.leave_type == "paid"
+    unpaid_leave = and_(workday, leave, not_(paid))
+    # day-of-month of that week's Monday: same value for every day of a week
+    week_key = cast(extract("day", WorkLog.work_date), Integer) - (dow + 6) % 7
+
+    rows = (
+        db.session.query(
+            month_no,
+            func.coalesce(func.sum(case((and_(workday, not_leave), WorkLog.overtime_minutes), else_=0)), 0),
+            func.count(case((and_(off_day, worked > 0), 1))),
+            func.coalesce(func.sum(case((and_(off_day, worked > 0), worked), else_=0)), 0),
+            func.count(case((and_(workday, leave, paid), 1))),
+            func.count(case((unpaid_leave, 1))),
+            func.count(distinct(case((unpaid_leave, week_key)))),
+            func.coalesce(func.sum(case(
+                (and_(workday, not_leave, WorkLog.in_time.isnot(None), WorkLog.out_time.isnot(None),
+                      worked < regular_cap), regular_cap - worked),
+                else_=0,
+            )), 0),
+        )
         .filter(WorkLog.user_id == user_id, WorkLog.work_date >= start, WorkLog.work_date < end)
-        .order_by(WorkLog.work_date.desc())
+        .group_by(month_no)
         .all()
     )
+    return {int(m): tuple(int(v) for v in totals) for m, *totals in rows}
+
+
+def _month_summary(s: SalarySettings, totals, allowance_total, deduction_total,
+                   paid_leave_used_year: int, logs) -> dict:
+    """Money math for one month from its settings, log totals and adjustment sums."""
+    (
+        total_ot_minutes,
+        weekend_holiday_days,
+        weekend_holiday_minutes,
+        paid_leave_days,        # paid annual leave days this month
+        leave_days,             # unpaid leave days only
+        penalty_days,           # 1 per week with any unpaid leave
+        short_minutes,
+    ) = totals
 
-    # overtime totals (minutes)
-    # overtime totals (minutes) - ONLY weekday overtime (Mon–Fri, non-holiday)
-    total_ot_minutes = 0
-    for l in logs:
-        d = l.work_date
-        if is_weekend(d) or is_holiday(user_id, d):
-            continue
-        if l.is_full_day_leave:
-            continue
-        total_ot_minutes += int(l.overtime_minutes or 0)
-
-
-    # weekend/holiday days count (worked > 0 on weekend/holiday)
-    weekend_holiday_days = 0
-    weekend_holiday_minutes = 0
-    for l in logs:
-        if (l.worked_minutes or 0) > 0 and (is_weekend(l.work_date) or is_holiday(user_id, l.work_date)):
-            weekend_holiday_days += 1
-            weekend_holiday_minutes += int(l.worked_minutes or 0)
-
-    # weekly unpaid leave + penalty
-    # paid annual leave does NOT create deduction or penalty
-    leave_days = 0          # unpaid leave days only
-    paid_leave_days = 0     # paid annual leave days this month
-    penalty_days = 0
-
-    week_map = {}
-
-    for l in logs:
-        d = l.work_date
-
-        if is_weekend(d) or is_holiday(user_id, d):
-            continue
-
-        if not l.is_full_day_leave:
-            continue
-
-        if is_paid_leave(l):
-            paid_leave_days += 1
-            continue
-
-        # unpaid leave only
-        ws = week_start_monday(d)
-        week_map.setdefault(ws, 0)
-        week_map[ws] += 1
-
-    for ws, L in week_map.items():
-        if L > 0:
-            leave_days += L
-            penalty_days += 1  # if any unpaid leave in a week, count 1 penalty day for that week
-
-    # money math
     hourly = _d(s.hourly_rate)
     ot_rate = hourly * _d(s.overtime_multiplier)
 
-    overtime_pay = (Decimal(total_ot_minutes) / Decimal(60)) * ot_rate
+    # minutes stay ints; each amount is one multiply and one divide by 60
+    overtime_pay = total_ot_minutes * ot_rate / _SIXTY
 
     # leave deduction = (leave_days + penalty_days) * hours/day * hourly_rate
     hours_per_day = _d(s.hours_per_day)
-    leave_deduction = Decimal(leave_days + penalty_days) * hours_per_day * hourly
+    leave_deduction = (leave_days + penalty_days) * hours_per_day * hourly
     # weekday short-hours deduction (worked < 8h)
-    short_minutes = 0
-
-    regular_cap = int(Decimal(s.hours_per_day) * 60)  # 8h -> 480 mins
-
-    for l in logs:
-        d = l.work_date
-
-        # only weekdays, non-holiday, not full-day leave
-        if is_weekend(d) or is_holiday(user_id, d):
-            continue
-        if l.is_full_day_leave:
-            continue
-
-        # must have time entry (otherwise we don't assume anything)
-        if not l.in_time or not l.out_time:
-            continue
-
-        worked = int(l.worked_minutes or 0)
-        if worked < regular_cap:
-            short_minutes += (regular_cap - worked)
-
-    short_hours_deduction = (Decimal(short_minutes) / Decimal(60)) * hourly
-
-    # monthly adjustments
-    allowance_total = (
-        db.session.query(func.coalesce(func.sum(SalaryAdjust.amount), 0))
-        .filter_by(user_id=user_id, year=year, month=month, kind="allowance")
-        .scalar()
-    )
-    deduction_total = (
-        db.session.query(func.coalesce(func.sum(SalaryAdjust.amount), 0))
-        .filter_by(user_id=user_id, year=year, month=month, kind="deduction")
-        .scalar()
-    )
+    short_hours_deduction = short_minutes * hourly / _SIXTY
 
     allowance_total = _d(allowance_total)
     deduction_total = _d(deduction_total)
 
     base_salary = _d(s.base_salary)
-    weekend_holiday_pay = (Decimal(weekend_holiday_minutes) / Decimal(60)) * ot_rate
+    weekend_holiday_pay = weekend_holiday_minutes * ot_rate / _SIXTY
     # net = base + OT + allowance - (deductions + leave_deduction)
     gross= base_salary + weekend_holiday_pay + overtime_pay + allowance_total
     net = base_salary + weekend_holiday_pay + overtime_pay + allowance_total - (deduction_total + leave_deduction + short_hours_deduction)
-    paid_leave_used_year = count_paid_leave_days_for_year(user_id, year)
     paid_leave_remaining_year = max(PAID_LEAVE_YEARLY_LIMIT - paid_leave_used_year, 0)
 
     # For your cards:
@@ -352,7 +320,7 @@ def calc_month_summary(user_id: int, year: int, month: int):
         "weekend_holiday_days": weekend_holiday_days,
         "weekend_holiday_minutes": weekend_holiday_minutes,
         "weekend_holiday_hours_str": fmt_hours_from_minutes(weekend_holiday_minutes),
-        "weekend_holiday_pay": (Decimal(weekend_holiday_minutes) / Decimal(60)) * ot_rate,  # info card
+        "weekend_holiday_pay": weekend_holiday_pay,  # info card
 
         "allowance_total": allowance_total,
         "deduction_total": deduction_total,
@@ -371,6 +339,87 @@ def calc_month_summary(user_id: int, year: int, month: int):
     }
 
 
+def calc_month_summary(user_id: int, year: int, month: int):
+    s = get_settings_for_month(user_id, year, month)
+    start, end = month_bounds(year, month)
+
+    logs = (
+        WorkLog.query
+        .filter(WorkLog.user_id == user_id, WorkLog.work_date >= start, WorkLog.work_date < end)
+        .order_by(WorkLog.work_date.desc())
+        .all()
+    )
+
+    totals = _log_totals_by_month(user_id, start, end, {month: _regular_cap(s)}).get(month, _NO_LOG_TOTALS)
+
+    # monthly adjustments
+    allowance_total = (
+        db.session.query(func.coalesce(func.sum(SalaryAdjust.amount), 0))
+        .filter_by(user_id=user_id, year=year, month=month, kind="allowance")
+        .scalar()
+    )
+    deduction_total = (
+        db.session.query(func.coalesce(func.sum(SalaryAdjust.amount), 0))
+        .filter_by(user_id=user_id, year=year, month=month, kind="deduction")
+        .scalar()
+    )
+
+    return _month_summary(s, totals, allowance_total, deduction_total,
+                          count_paid_leave_days_for_year(user_id, year), logs)
+
+
+def calc_year_summaries(user_id: int, year: int) -> dict[int, dict]:
+    """
+    calc_month_summary for all 12 months at once, without the log rows:
+    settings, log totals and adjustment sums are each read in one query
+    for the whole year instead of once per month.
+    """
+    # Settings in force on each month's 1st: newest effective_from <= that day
+    settings = (
+        SalarySettings.query
+        .filter(SalarySettings.user_id == user_id,
+                SalarySettings.effective_from <= date(year, 12, 1))
+        .order_by(SalarySettings.effective_from.desc(), SalarySettings.id.desc())
+        .all()
+    )
+    by_month = {}
+    for m in range(1, 13):
+        target = date(year, m, 1)
+        s = next((x for x in settings if x.effective_from <= target), None)
+        if s is None:
+            # none yet: same fallback as get_settings_for_month (creates a
+            # default); it's older than every loaded row, so order holds
+            s = get_settings_for_month(user_id, year, m)
+            settings.append(s)
+        by_month[m] = s
+
+    totals = _log_totals_by_month(
+        user_id, date(year, 1, 1), date(year + 1, 1, 1),
+        {m: _regular_cap(s) for m, s in by_month.items()},
+    )
+
+    adjust = defaultdict(Decimal)
+    for m, kind, total in (
+        db.session.query(SalaryAdjust.month, SalaryAdjust.kind, func.sum(SalaryAdjust.amount))
+        .filter(SalaryAdjust.user_id == user_id, SalaryAdjust.year == year)
+        .group_by(SalaryAdjust.month, SalaryAdjust.kind)
+    ):
+        adjust[(m, kind)] = total or 0
+
+    # paid leave on working days, summed over the year
+    # (same count as count_paid_leave_days_for_year)
+    paid_leave_used_year = sum(t[3] for t in totals.values())
+
+    return {
+        m: _month_summary(
+            by_month[m], totals.get(m, _NO_LOG_TOTALS),
+            adjust[(m, "allowance")], adjust[(m, "deduction")],
+            paid_leave_used_year, [],
+        )
+        for m in range(1, 13)
+    }
+
+
 def iter_months(y1, m1, y2, m2):
     y, m = y1, m1
     while (y < y2) or (y == y2 and m <= m2):
@@ -404,11 +453,7 @@ def salary_page():
     total_deductions = summary["deduction_total"] + summary["leave_deduction"]
 
     # 1) all days of month
-    days = []
-    d = start
-    while d < end:
-        days.append(d)
-        d += timedelta(days=1)
+    days = [date(year, month, i) for i in range(1, calendar.monthrange(year, month)[1] + 1)]
 
     # 2) existing logs -> dict by date
     log_by_date = {l.work_date: l for l in summary["logs"]}
@@ -593,13 +638,20 @@ def salary_settings_page():
         return redirect(url_for("main.salary_settings_page"))
 
     # GET
-    current = get_current_settings(_uid())
     history = (
         SalarySettings.query
         .filter_by(user_id=_uid())
         .order_by(SalarySettings.effective_from.desc(), SalarySettings.id.desc())
         .all()
     )
+    # current = first version in force this month (same rule as get_current_settings,
+    # which still creates the default when there is none yet; that one is older
+    # than every loaded version, so it goes last)
+    this_month = month_start(date.today())
+    current = next((x for x in history if x.effective_from <= this_month), None)
+    if current is None:
+        current = get_current_settings(_uid())
+        history.append(current)
 
     return render_template(
         "settings.html",
@@ -832,24 +884,31 @@ def salary_long_leave_apply():
     updated = 0
     skipped = 0
 
-    d = start
-    while d <= end:
+    # existing logs in the range, loaded once (not one lookup per day)
+    existing = {
+        l.work_date: l
+        for l in WorkLog.query.filter(
+            WorkLog.user_id == _uid(),
+            WorkLog.work_date >= start,
+            WorkLog.work_date <= end,
+        )
+    }
+
+    for i in range((end - start).days + 1):
+        d = start + timedelta(days=i)
         # skip weekends
         if d.weekday() >= 5:
-            d += timedelta(days=1)
             continue
 
         # skip holidays
         if d in holiday_set:
-            d += timedelta(days=1)
             continue
 
-        log = WorkLog.query.filter_by(user_id=_uid(), work_date=d).first()
+        log = existing.get(d)
 
         if log and not overwrite:
             # If there is already any record (work or leave), skip
             skipped += 1
-            d += timedelta(days=1)
             continue
 
         if not log:
@@ -874,8 +933,6 @@ def salary_long_leave_apply():
         log.regular_minutes = 0
         log.overtime_minutes = 0
 
-        d += timedelta(days=1)
-
     db.session.commit()
 
     # go to month of start (or end) — we'll use start
@@ -891,25 +948,31 @@ def salary_long_leave_remove():
         start, end = end, start
 
     # Only target logs that are marked as full-day leave
-    qy = (
-        WorkLog.query
-        .filter(
-            WorkLog.user_id == _uid(),
-            WorkLog.work_date >= start,
-            WorkLog.work_date <= end,
-            WorkLog.is_full_day_leave.is_(True),
-        )
+    in_range = (
+        WorkLog.user_id == _uid(),
+        WorkLog.work_date >= start,
+        WorkLog.work_date <= end,
+        WorkLog.is_full_day_leave.is_(True),
     )
 
-    # safest: delete only "pure leave rows" (no in/out and 0 minutes)
-    logs = qy.all()
-    for log in logs:
-        pure_leave = (log.in_time is None and log.out_time is None and (log.worked_minutes or 0) == 0)
-        if pure_leave:
-            db.session.delete(log)
-        else:
-            # if somehow mixed data exists, just unmark leave
-            log.is_full_day_leave = False
+    # safest: delete only "pure leave rows" (no in/out and 0 minutes) — one DELETE
+    db.session.execute(
+        delete(WorkLog)
+        .where(
+            *in_range,
+            WorkLog.in_time.is_(None),
+            WorkLog.out_time.is_(None),
+            func.coalesce(WorkLog.worked_minutes, 0) == 0,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # if somehow mixed data exists, just unmark leave — one UPDATE for what's left
+    db.session.execute(
+        update(WorkLog)
+        .where(*in_range)
+        .values(is_full_day_leave=False)
+        .execution_options(synchronize_session=False)
+    )
 
     db.session.commit()
     return redirect(url_for("main.salary_page", year=start.year, month=start.month))
@@ -984,8 +1047,9 @@ def salary_summary_data():
     gross_series = []
     net_series = []
 
+    summaries = calc_year_summaries(_uid(), year)
     for m in range(1, 13):
-        s = calc_month_summary(_uid(), year, m)
+        s = summaries[m]
 
         gross = (
             _d(s["base_salary"])
@@ -1001,7 +1065,7 @@ def salary_summary_data():
 
     # Selected month summary OR whole year summary
     if month and 1 <= month <= 12:
-        s = calc_month_summary(_uid(), year, month)
+        s = summaries[month]
         gross = (
             _d(s["base_salary"])
             + _d(s["overtime_pay"])
@@ -1053,7 +1117,7 @@ def _salary_float(value):
 
 
 def _salary_hours_from_minutes(minutes):
-    return round(float(Decimal(minutes or 0) / Decimal(60)), 2)
+    return round(float(Decimal(minutes or 0) / _SIXTY), 2)
 
 
 def _salary_adjust_breakdown(user_id, year, month=None):
@@ -1227,8 +1291,9 @@ def api_salary_analysis():
 
     monthly_series = []
 
+    summaries = calc_year_summaries(_uid(), year)
     for m in range(1, 13):
-        month_summary = calc_month_summary(_uid(), year, m)
+        month_summary = summaries[m]
 
         gross = _d(month_summary["gross"])
         net = _d(month_summary["net"])
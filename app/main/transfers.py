@@ -9,7 +9,7 @@ from ..main import main
 from ..extensions import db
 from ..models import (
     Account, AccountType, Currency, Recipient,
-    TransactionKRW, TransactionBDT, TxnType
+    TransactionKRW, TransactionBDT, TxnType, TXN_MODEL_BY_CURRENCY,
 )
 from app.utils.helpers import get_page_title
 # --------------------------
@@ -50,7 +50,7 @@ def _get_acc(uid: int, acc_id: int) -> Account | None:
     return db.session.query(Account).filter_by(id=acc_id, user_id=uid, is_active=True).first()
 
 def _txn_model_for(curr: Currency):
-    return TransactionKRW if curr == Currency.KRW else TransactionBDT
+    return TXN_MODEL_BY_CURRENCY[curr]
 
 def _find_or_create_external(uid: int, curr: Currency) -> Account:
     name = f"External ({curr.value})"
@@ -3,9 +3,8 @@ from datetime import datetime
 from enum import Enum
 
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 
-from sqlalchemy import func, text, select, and_,Index, UniqueConstraint, ForeignKey
+from sqlalchemy import func, text, select, and_,Index, UniqueConstraint, ForeignKey, literal_column
 from sqlalchemy.orm import relationship, declared_attr, column_property
 from .extensions import db
 from sqlalchemy.dialects.postgresql import JSONB
@@ -24,10 +23,12 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, nullable=False)
 
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        from .utils.passwords import hash_password
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        from .utils.passwords import verify_password
+        return verify_password(self.password_hash, password)
 
 
 # --------------------------
@@ -89,6 +90,8 @@ class Account(db.Model):
 
     initial_balance = db.Column(db.Numeric(14, 2), nullable=False, server_default=text("0"))
     credit_limit = db.Column(db.Numeric(14, 2), nullable=True)  # ✅ Only for credit cards
+    # Running sum of pending expense/fee txns (positive); see services/card_pending.py
+    pending_total = db.Column(db.Numeric(14, 2), nullable=False, server_default=text("0"))
     is_active = db.Column(db.Boolean, nullable=False, server_default=text("true"))
 
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow)
@@ -149,7 +152,9 @@ class Category(db.Model):
     parent = db.relationship(
         "Category",
         remote_side=[id],
-        backref=db.backref("children", cascade="all, delete-orphan", lazy="selectin"),
+        backref=db.backref(
+            "children", cascade="all, delete-orphan", lazy="selectin", order_by="Category.name"
+        ),
         lazy="joined",
     )
 
@@ -157,6 +162,16 @@ class Category(db.Model):
     # user = db.relationship("User", backref=db.backref("categories", lazy="dynamic"))
 
 
+# Case-insensitive uniqueness within the same parent (top-level = parent 0);
+# create_category relies on it for INSERT ... ON CONFLICT DO NOTHING.
+Index(
+    "ux_category_user_parent_lower",
+    Category.user_id,
+    func.coalesce(Category.parent_id, literal_column("0")),
+    func.lower(Category.name),
+    unique=True,
+)
+
 
 # --------------------------
 # Transactions (Mixin)
@@ -221,14 +236,25 @@ class _TxnBase:
 # --------------------------
 # Transactions tables
 # --------------------------
+# Predicate of the partial "pending card rows" indexes below
+_PENDING_LIVE = text("is_pending AND NOT is_deleted")
+# Carried in the (user_id, type, date) indexes (Postgres INCLUDE) so the
+# per-type month sums (income total, transfer spend) are index-only scans
+_TYPE_SUM_COLS = ["amount", "is_deleted"]
+
+
 class TransactionKRW(db.Model, _TxnBase):
     __tablename__ = "transactions_krw"
     __table_args__ = (
         db.Index("ix_t_krw_user_date", "user_id", "date"),
-        db.Index("ix_t_krw_user_type_date", "user_id", "type", "date"),
+        db.Index("ix_t_krw_user_type_date", "user_id", "type", "date",
+                 postgresql_include=_TYPE_SUM_COLS),
         db.Index("ix_t_krw_user_recipient_date", "user_id", "recipient_id", "date"),
         db.Index("ix_t_krw_user_method_date", "user_id", "method", "date"),
         db.Index("ix_t_krw_user_category_date", "user_id", "category_id", "date"),
+        # credit-card pending rows: per-card pending sums + FIFO settlement order
+        db.Index("ix_t_krw_user_account_pending", "user_id", "account_id", "date", "id",
+                 postgresql_where=_PENDING_LIVE, sqlite_where=_PENDING_LIVE),
         {"sqlite_autoincrement": True},
     )
 
@@ -237,14 +263,22 @@ class TransactionBDT(db.Model, _TxnBase):
     __tablename__ = "transactions_bdt"
     __table_args__ = (
         db.Index("ix_t_bdt_user_date", "user_id", "date"),
-        db.Index("ix_t_bdt_user_type_date", "user_id", "type", "date"),
+        db.Index("ix_t_bdt_user_type_date", "user_id", "type", "date",
+                 postgresql_include=_TYPE_SUM_COLS),
         db.Index("ix_t_bdt_user_recipient_date", "user_id", "recipient_id", "date"),
         db.Index("ix_t_bdt_user_method_date", "user_id", "method", "date"),
         db.Index("ix_t_bdt_user_category_date", "user_id", "category_id", "date"),
+        # credit-card pending rows: per-card pending sums + FIFO settlement order
+        db.Index("ix_t_bdt_user_account_pending", "user_id", "account_id", "date", "id",
+                 postgresql_where=_PENDING_LIVE, sqlite_where=_PENDING_LIVE),
         {"sqlite_autoincrement": True},
     )
 
 
+# Ledger table per account currency
+TXN_MODEL_BY_CURRENCY = {Currency.KRW: TransactionKRW, Currency.BDT: TransactionBDT}
+
+
 
 class RecurringFrequency(str, Enum):
     daily = "daily"
@@ -303,7 +337,10 @@ class Budget(db.Model):
     category = db.relationship("Category", backref="budgets", lazy=True)
 
     __table_args__ = (
-        db.UniqueConstraint("user_id", "category_id", "year", "month", name="uq_budget_user_cat_month"),
+        # (user, year, month) leading: also serves the month lookups, not just the upsert;
+        # amount carried along (Postgres INCLUDE) so those lookups are index-only
+        db.UniqueConstraint("user_id", "year", "month", "category_id", name="uq_budget_user_cat_month",
+                            postgresql_include=["amount"]),
     )
 
 
@@ -317,7 +354,20 @@ class DebtDirection(str, Enum):
 
 class DebtItem(db.Model):
     __tablename__ = "debt_items"
-    __table_args__ = ({"sqlite_autoincrement": True},)
+    __table_args__ = (
+        # per-person / card aggregates: covering on Postgres (index-only scan)
+        db.Index(
+            "ix_debt_items_user_status_dir", "user_id", "status", "direction",
+            postgresql_include=["original_principal", "outstanding_principal", "recipient_id"],
+        ),
+        # repay_person: one person's open items, oldest first
+        db.Index(
+            "ix_debt_items_user_open", "user_id", "recipient_id", "direction", "start_date", "id",
+            postgresql_where=text("status = 'active' AND outstanding_principal > 0"),
+            sqlite_where=text("status = 'active' AND outstanding_principal > 0"),
+        ),
+        {"sqlite_autoincrement": True},
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, nullable=False, index=True)
@@ -341,7 +391,8 @@ class DebtItem(db.Model):
 class DebtTxn(db.Model):
     __tablename__ = "debt_txns"
     __table_args__ = (
-        db.Index("ix_debt_txns_user_date", "user_id", "date"),
+        # list_txns: WHERE user_id ORDER BY date DESC, id DESC
+        db.Index("ix_debt_txns_user_date_id", "user_id", "date", "id"),
         {"sqlite_autoincrement": True},
     )
 
@@ -370,7 +421,7 @@ class BudgetType(db.Model):
     __tablename__ = "budgets_type"
     __table_args__ = (
         db.UniqueConstraint("user_id", "year", "month", "txn_type",
-                            name="uq_btype_user_year_month_type"),
+                            name="uq_btype_user_year_month_type", postgresql_include=["amount"]),
         {"sqlite_autoincrement": True},
     )
 
@@ -411,7 +462,8 @@ class WorkLog(db.Model):
     __tablename__ = "work_logs"
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, index=True, nullable=False)
+    # per-user lookups use the (user_id, work_date) unique constraint below
+    user_id = db.Column(db.Integer, nullable=False)
     work_date = db.Column(db.Date, nullable=False, index=True)
     
     in_time = db.Column(db.Time, nullable=True)
@@ -437,7 +489,8 @@ class Holiday(db.Model):
     __tablename__ = "holidays"
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, index=True, nullable=False)
+    # per-user lookups use the (user_id, holiday_date) unique constraint below
+    user_id = db.Column(db.Integer, nullable=False)
 
     holiday_date = db.Column(db.Date, nullable=False, index=True)
     name = db.Column(db.String(120), nullable=False, default="")
@@ -544,6 +597,13 @@ class LottoDraw(db.Model):
         passive_deletes=True,
     )
 
+    pairs = db.relationship(
+        "LottoDrawPair",
+        lazy=True,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
 
 class LottoDrawNumber(db.Model):
     __tablename__ = "lotto_draw_number"
@@ -553,6 +613,8 @@ class LottoDrawNumber(db.Model):
         Index("idx_lotto_draw_number_num", "num"),
         Index("idx_lotto_draw_number_draw", "draw_id"),
         Index("idx_lotto_draw_number_num_draw", "num", "draw_id"),
+        # window aggregates: draw_id IN (...) AND is_bonus = false, reading num
+        Index("idx_lotto_draw_number_draw_bonus_num", "draw_id", "is_bonus", "num"),
         # NOTE: do NOT use a normal unique constraint on (draw_id, position) here,
         # because we want it to apply only to main numbers (bonus has position NULL).
         # We'll enforce main-position uniqueness with a partial unique index in SQL:
@@ -578,6 +640,23 @@ class LottoDrawNumber(db.Model):
     is_bonus = db.Column(db.Boolean, nullable=False, default=False)
 
 
+class LottoDrawPair(db.Model):
+    """
+    The 15 (a < b) pairs of a draw's 6 main numbers, written once when the draw
+    is inserted. Windowed pair frequency is then a plain GROUP BY a, b over
+    the window's draw_ids (PK range scan), with no per-request pair expansion.
+    """
+    __tablename__ = "lotto_draw_pair"
+
+    draw_id = db.Column(
+        db.BigInteger,
+        ForeignKey("lotto_draw.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    a = db.Column(db.SmallInteger, primary_key=True)
+    b = db.Column(db.SmallInteger, primary_key=True)
+
+
 class LottoDrawStats(db.Model):
     __tablename__ = "lotto_draw_stats"
     __table_args__ = (
@@ -1,10 +1,11 @@
 # app/scheduler.py
 import os
 import logging
-from datetime import date
+from datetime import date, datetime
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 
@@ -15,6 +16,8 @@ from .services.recurring import run_due_rules_for_user
 logger = logging.getLogger(__name__)
 
 PG_LOCK_KEY = 0x6C5E_1234_0000_0002  # any int < 2^63
+PG_LEADER_KEY = 0x6C5E_1234_0000_0003  # held for life by the process that runs the jobs
+ELECTION_JOB_ID = "recurring-leader-election"
 
 def _is_postgres(engine: Engine) -> bool:
     try:
@@ -74,26 +77,69 @@ def _run_all_due_today(app):
         finally:
             _release_lock()
 
+def _become_leader(app) -> bool:
+    """
+    Postgres: take PG_LEADER_KEY on a connection kept open for the life of the
+    process. When the leader exits (worker restart, HUP reload) its connection
+    closes, the lock is freed and the next election in another process wins.
+    Other DBs: always lead (single-process dev setups).
+    """
+    with app.app_context():
+        engine = db.engine
+        if not _is_postgres(engine):
+            return True
+        conn = engine.connect()
+        try:
+            got = conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": PG_LEADER_KEY}).scalar()
+            conn.commit()  # session-level lock: outlives the transaction
+        except Exception as e:
+            logger.error(f"[recurring] Leader election failed: {e}")
+            conn.close()
+            return False
+        if not got:
+            conn.close()
+            return False
+        app.extensions["recurring_leader_conn"] = conn
+        return True
+
+def _elect(app, sched):
+    if not _become_leader(app):
+        return
+    sched.remove_job(ELECTION_JOB_ID)
+    sched.add_job(lambda: _run_all_due_today(app), CronTrigger(hour=1, minute=10))
+    # Optional: hourly safety pulse
+    # sched.add_job(lambda: _run_all_due_today(app), CronTrigger(minute=5))
+    logger.info("[recurring] Elected scheduler leader (Asia/Seoul @ 01:10)")
+
+    # Catch-up once on taking over
+    _run_all_due_today(app)
+
 def start_scheduler(app):
     """
-    Start APScheduler exactly once.
+    Start APScheduler once per process (reloader child / every gunicorn worker;
+    set SCHEDULER_ENABLED=0 to turn it off entirely). Each process retries a
+    Postgres advisory-lock election every minute; only the leader schedules
+    the recurring run, and another process takes over when it goes away.
     - Daily run at 01:10 Asia/Seoul (you set 1:10; keep or change).
-    - Boot catch-up run immediately.
+    - Catch-up run when a process becomes leader.
     - Optional hourly pulse (commented).
     """
     # Avoid double-start with Flask reloader / multiple imports
     if app.config.get("APSCHEDULER_STARTED"):
         return
+    if os.environ.get("SCHEDULER_ENABLED", "1") != "1":
+        logger.info("[recurring] Scheduler disabled (SCHEDULER_ENABLED != 1).")
+        return
     if os.environ.get("WERKZEUG_RUN_MAIN") == "true" or not app.debug:
         sched = BackgroundScheduler(timezone="Asia/Seoul")
-        sched.add_job(lambda: _run_all_due_today(app), CronTrigger(hour=1, minute=10))
-        # Optional: hourly safety pulse
-        # sched.add_job(lambda: _run_all_due_today(app), CronTrigger(minute=5))
+        sched.add_job(
+            lambda: _elect(app, sched),
+            IntervalTrigger(minutes=1),
+            id=ELECTION_JOB_ID,
+            next_run_time=datetime.now(sched.timezone),
+        )
         sched.start()
         app.config["APSCHEDULER_STARTED"] = True
-        logger.info("[recurring] Scheduler started (Asia/Seoul @ 01:10)")
-
-        # Boot catch-up once
-        _run_all_due_today(app)
+        logger.info("[recurring] Scheduler started; waiting for leader election")
     else:
         logger.info("[recurring] Skipping scheduler in reloader child process.")
@@ -6,9 +6,10 @@ from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal
 
-from sqlalchemy import func, and_, not_, select
+from sqlalchemy import func, and_, not_, or_, select, union_all
 
-from ..extensions import db
+from ..extensions import db, cache
+from .cache_versions import data_version
 from ..models import (
     Category,
     Budget,
@@ -80,11 +81,42 @@ def _month_bounds(y: int, m: int) -> tuple[date, date]:
     return start, end
 
 
+# Entries are keyed on the user's data versions, so a write never leaves a
+# stale page behind; the timeout just lets idle entries age out.
+_CACHE_TTL = 3600
+
+
+def _versions(user_id: int) -> tuple[str, str, str]:
+    """Cache-key part: budget pages depend on transactions, budgets and the category tree."""
+    return data_version("txn", user_id), data_version("budget", user_id), data_version("category", user_id)
+
+
 def _model_for_currency(_currency_ignored: str):
     """Force KRW per requirement."""
     return TransactionKRW
 
 
+def _category_tree(user_id: int):
+    """(by_id, children_of, roots) for the user's categories."""
+    cats = db.session.query(Category.id, Category.name, Category.parent_id)\
+        .filter(Category.user_id == user_id).all()
+    by_id = {cid: (name, pid) for cid, name, pid in cats}
+    children_of: dict[int, list[int]] = defaultdict(list)
+    roots: list[int] = []
+    for cid, (name, pid) in by_id.items():
+        if pid is None:
+            roots.append(cid)
+        else:
+            children_of[pid].append(cid)
+    return by_id, children_of, roots
+
+
+def _is_settlement(Model):
+    """Credit-card settlement transfers booked as expenses (not real spending)."""
+    note_l = func.lower(func.coalesce(Model.note, ""))
+    return and_(note_l.like("%credit%card%"), note_l.like("%settlement%"))
+
+
 # --------------------------
 # Core: compute budget page
 # --------------------------
@@ -95,46 +127,60 @@ def compute_budget_page(user_id: int, currency: str, year: int, month: int) -> d
       - 'International Transfer' shown as a separate TYPE pseudo-row:
           budget from BudgetType(txn_type=transfer_international)
           spent  from transactions of type transfer_international
+      - No budgets at all this month: table rows show last month's budgets
+        ("used_fallback")
+    Cached across requests (see _versions); callers get their own copy.
     """
+    return _budget_page_cached(user_id, currency, year, month, _versions(user_id))
+
+
+@cache.memoize(timeout=_CACHE_TTL)
+def _budget_page_cached(user_id: int, currency: str, year: int, month: int, versions) -> dict:
     Model = _model_for_currency("KRW")
     start, end = _month_bounds(year, month)
 
     # --- categories for THIS user only
-    cats = db.session.query(Category.id, Category.name, Category.parent_id)\
-        .filter(Category.user_id == user_id).all()
-    by_id = {cid: (name, pid) for cid, name, pid in cats}
-    children_of: dict[int, list[int]] = defaultdict(list)
-    roots: list[int] = []
-    for cid, (name, pid) in by_id.items():
-        if pid is None:
-            roots.append(cid)
-        else:
-            children_of[pid].append(cid)
-
-    # --- budgets: parent-only (ignore children here)
-    raw_budgets = (
-        db.session.query(Budget.category_id, func.coalesce(func.sum(Budget.amount), 0))
-        .filter(Budget.user_id == user_id,
-                Budget.year == year, Budget.month == month,
-                Budget.category_id.in_(roots))
-        .group_by(Budget.category_id)
-        .all()
-    )
-    budget_map: dict[int, Decimal] = {cid: Decimal(amt or 0) for cid, amt in raw_budgets}
+    by_id, children_of, roots = _category_tree(user_id)
+
+    # --- budgets for this month AND the previous one (for the fallback below),
+    #     one query per table; the months always differ, so `month` tells them apart
+    prev_y, prev_m = (year - 1, 12) if month == 1 else (year, month - 1)
+    root_ids = set(roots)
+    have_any_curr = False
+
+    budget_map: dict[int, Decimal] = {}  # parent-only (ignore children here)
+    prev_cat_map: dict[int, Decimal] = {}
+    for cid, m, amt in db.session.execute(
+        select(Budget.category_id, Budget.month, Budget.amount)
+        .where(Budget.user_id == user_id,
+               or_(and_(Budget.year == year, Budget.month == month),
+                   and_(Budget.year == prev_y, Budget.month == prev_m)))
+    ):
+        if m == month:
+            have_any_curr = True
+            if cid in root_ids:
+                budget_map[cid] = budget_map.get(cid, Decimal(0)) + Decimal(amt or 0)
+        elif cid is not None:
+            prev_cat_map[cid] = amt
 
     # --- TYPE budget: transfer_international (from BudgetType)
-    type_budget_val = (
-        db.session.query(func.coalesce(func.sum(BudgetType.amount), 0))
-        .filter(BudgetType.user_id == user_id,
-                BudgetType.year == year, BudgetType.month == month,
-                BudgetType.txn_type == TxnType.transfer_international)
-        .scalar() or 0
-    )
-    type_budget = Decimal(type_budget_val or 0)
+    type_budget = Decimal(0)
+    prev_type_amt = None
+    for t, m, amt in db.session.execute(
+        select(BudgetType.txn_type, BudgetType.month, BudgetType.amount)
+        .where(BudgetType.user_id == user_id,
+               or_(and_(BudgetType.year == year, BudgetType.month == month),
+                   and_(BudgetType.year == prev_y, BudgetType.month == prev_m)))
+    ):
+        if m == month:
+            have_any_curr = True
+            if t == TxnType.transfer_international:
+                type_budget += Decimal(amt or 0)
+        elif t == TxnType.transfer_international:
+            prev_type_amt = amt
 
     # --- spent per category (exclude credit-card settlements)
-    note_l = func.lower(func.coalesce(Model.note, ""))
-    is_settlement = and_(note_l.like("%credit%card%"), note_l.like("%settlement%"))
+    is_settlement = _is_settlement(Model)
 
     spent_rows = (
         db.session.query(Model.category_id, func.coalesce(func.sum(-Model.amount), 0))
@@ -232,6 +278,17 @@ def compute_budget_page(user_id: int, currency: str, year: int, month: int) -> d
         key=lambda x: (x["id"] == TYPE_ROW_ID, x["name"].lower())
     )
 
+    # --- fallback: no budgets at all this month -> show the previous month's
+    #     amounts in the table (rows without a budget only; totals unchanged)
+    used_fallback = False
+    if not have_any_curr:
+        for row in table:
+            if row["budget"] == 0:
+                amt = prev_type_amt if row["id"] == TYPE_ROW_ID else prev_cat_map.get(row["id"])
+                if amt:
+                    row["budget"] = float(amt)
+        used_fallback = bool(prev_cat_map or prev_type_amt)
+
     # bar chart (parents + type)
     bar_labels = [r["name"] for r in table]
     bar_values = [r["spent"] for r in table]
@@ -247,14 +304,87 @@ def compute_budget_page(user_id: int, currency: str, year: int, month: int) -> d
         "table": table,
         "bar_chart": {"labels": bar_labels, "values": bar_values},
         "symbol": "₩",  # KRW
+        "used_fallback": used_fallback,
     }
 
 
+# --------------------------
+# Yearly lines (budget vs spent per month)
+# --------------------------
+def compute_year_lines(user_id: int, currency: str, year: int) -> dict:
+    """
+    Monthly totals for the whole year, equal to compute_budget_page(...)["totals"]
+    budget/spent for each month, but from two GROUP BY month queries instead of
+    twelve full page computations.
+    Returns {"budget": [12 floats], "spent": [12 floats]} (index 0 = January).
+    """
+    return _year_lines_cached(user_id, currency, year, _versions(user_id))
+
+
+@cache.memoize(timeout=_CACHE_TTL)
+def _year_lines_cached(user_id: int, currency: str, year: int, versions) -> dict:
+    Model = _model_for_currency("KRW")
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+
+    # Parent budgets and their descendants' spending, as on the monthly page
+    _, children_of, roots = _category_tree(user_id)
+    in_tree: list[int] = []
+    stack = list(roots)
+    while stack:
+        cur = stack.pop()
+        in_tree.append(cur)
+        stack.extend(children_of.get(cur, []))
+
+    budget = [Decimal(0)] * 12
+    spent = [Decimal(0)] * 12
+
+    # --- budget per month: parent-category budgets + the TYPE budget in one pass
+    budget_rows = union_all(
+        select(Budget.month.label("month"), Budget.amount.label("amount"))
+        .where(Budget.user_id == user_id, Budget.year == year,
+               Budget.category_id.in_(roots)),
+        select(BudgetType.month, BudgetType.amount)
+        .where(BudgetType.user_id == user_id, BudgetType.year == year,
+               BudgetType.txn_type == TxnType.transfer_international),
+    ).subquery()
+    for m, amt in db.session.execute(
+        select(budget_rows.c.month, func.coalesce(func.sum(budget_rows.c.amount), 0))
+        .group_by(budget_rows.c.month)
+    ):
+        budget[m - 1] += Decimal(amt or 0)
+
+    # --- spent per month: category spending + the TYPE row in one pass
+    month_col = func.extract("month", Model.date)
+    for m, val in (
+        db.session.query(month_col, func.coalesce(func.sum(-Model.amount), 0))
+        .filter(Model.user_id == user_id,
+                Model.is_deleted.is_(False),
+                Model.date >= start, Model.date < end,
+                or_(
+                    and_(Model.type.in_([TxnType.expense, TxnType.fee]),
+                         not_(_is_settlement(Model)),
+                         Model.category_id.in_(in_tree)),
+                    Model.type == TxnType.transfer_international,
+                ))
+        .group_by(month_col)
+        .all()
+    ):
+        spent[int(m) - 1] += Decimal(val or 0)
+
+    return {"budget": [float(v) for v in budget], "spent": [float(v) for v in spent]}
+
+
 # --------------------------
 # KPIs
 # --------------------------
 def month_income_total(user_id: int, currency: str, year: int, month: int) -> Decimal:
     """Sum of INCOME (KRW) transactions for the month (amounts are positive for income)."""
+    # Keyed on the "income" version only: expense/transfer writes don't evict it
+    return _income_total_cached(user_id, currency, year, month, data_version("income", user_id))
+
+
+@cache.memoize(timeout=_CACHE_TTL)
+def _income_total_cached(user_id: int, currency: str, year: int, month: int, version: str) -> Decimal:
     Model = TransactionKRW  # forced
     start, end = _month_bounds(year, month)
 
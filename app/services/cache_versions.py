@@ -0,0 +1,90 @@
+# app/services/cache_versions.py
+# ---------------------------------
+# Per-user data versions for cross-request caches.
+#
+# Cached results are memoized with the current version(s) as an extra
+# argument; bumping a version after a commit makes every older entry
+# unreachable, so nothing is ever served stale (the TTLs only bound memory).
+#
+# Versions are random tokens stored without expiry. If one is evicted
+# anyway, the next read mints a fresh token instead of falling back to a
+# value that older entries may still be keyed on.
+#
+# Scopes:
+#   "txn"      – TransactionKRW / TransactionBDT rows
+#   "budget"   – Budget / BudgetType rows
+#   "category" – the category tree (its own scope, so saving budgets doesn't
+#                invalidate caches that only depend on the tree)
+#   "income"   – income-type transaction rows (also count as "txn"); lets the
+#                monthly income KPI survive expense edits
+#
+# ORM writes are picked up automatically by the session hooks below;
+# Core INSERT/UPDATE/DELETE statements must call mark_changed() themselves.
+
+from __future__ import annotations
+
+from uuid import uuid4
+
+from flask import has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..extensions import cache
+from ..models import Budget, BudgetType, Category, TransactionKRW, TransactionBDT, TxnType
+
+_SCOPE_BY_MODEL = {
+    TransactionKRW: "txn",
+    TransactionBDT: "txn",
+    Budget: "budget",
+    BudgetType: "budget",
+    Category: "category",
+}
+
+
+def _touches_income(txn, is_new: bool) -> bool:
+    """Whether a txn is, or may have been before this flush, an income row."""
+    # A retyped row counts even when its old type isn't loaded (expired after commit)
+    retyped = not is_new and inspect(txn).attrs.type.history.has_changes()
+    return txn.type == TxnType.income or retyped
+
+
+def _version_key(scope: str, user_id: int) -> str:
+    return f"{scope}_ver:{user_id}"
+
+
+def data_version(scope: str, user_id: int) -> str:
+    key = _version_key(scope, user_id)
+    ver = cache.get(key)
+    if ver is None:
+        cache.add(key, uuid4().hex, timeout=0)  # add: keep a concurrent bump
+        ver = cache.get(key)
+    return ver
+
+
+def mark_changed(session: Session, scope: str, user_id: int) -> None:
+    """Bump `scope` for `user_id` once the session's transaction commits."""
+    session.info.setdefault("cache_versions", set()).add((scope, user_id))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        scope = _SCOPE_BY_MODEL.get(type(obj))
+        if scope:
+            mark_changed(session, scope, obj.user_id)
+            if scope == "txn" and _touches_income(obj, obj in session.new):
+                mark_changed(session, "income", obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session):
+    changed = session.info.pop("cache_versions", ())
+    if not changed or not has_app_context():
+        return
+    for scope, user_id in changed:
+        cache.set(_version_key(scope, user_id), uuid4().hex, timeout=0)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_tracked(session):
+    session.info.pop("cache_versions", None)
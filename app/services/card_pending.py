@@ -0,0 +1,110 @@
+# app/services/card_pending.py
+# ---------------------------------
+# Account.pending_total: the running sum of a card's pending expense/fee
+# transactions (positive number), kept up to date on every flush so the
+# payments page never has to aggregate the ledger.
+
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import bindparam, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..extensions import db
+from ..models import Account, TransactionKRW, TransactionBDT, TxnType
+
+PENDING_TYPES = (TxnType.expense, TxnType.fee)
+
+_TXN_MODELS = (TransactionKRW, TransactionBDT)
+_TRACKED = ("account_id", "amount", "type", "is_pending", "is_deleted")
+
+# UPDATE accounts SET pending_total = pending_total + :delta WHERE id = :acc
+# (relative, so concurrent writers to the same card don't lose updates)
+_BUMP_STMT = (
+    update(Account.__table__)
+    .where(Account.__table__.c.id == bindparam("acc"))
+    .values(pending_total=Account.__table__.c.pending_total + bindparam("delta"))
+)
+
+
+def _contribution(account_id, amount, ttype, is_pending, is_deleted):
+    """(account_id, positive pending amount) one txn state adds, or None."""
+    if account_id is None or not is_pending or is_deleted or ttype not in PENDING_TYPES:
+        return None
+    return account_id, -Decimal(amount or 0)
+
+
+def _old_state(obj):
+    """Tracked column values as they were before this flush."""
+    state = inspect(obj)
+    old = []
+    for key in _TRACKED:
+        hist = state.attrs[key].history
+        if hist.deleted:
+            old.append(hist.deleted[0])
+        elif hist.unchanged:
+            old.append(hist.unchanged[0])
+        else:
+            old.append(getattr(obj, key))
+    return old
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_pending_deltas(session, flush_context):
+    deltas: dict[int, Decimal] = defaultdict(Decimal)
+
+    def add(contrib, sign):
+        if contrib:
+            deltas[contrib[0]] += sign * contrib[1]
+
+    for obj in session.new:
+        if isinstance(obj, _TXN_MODELS):
+            add(_contribution(*(getattr(obj, k) for k in _TRACKED)), 1)
+    for obj in session.dirty:
+        if isinstance(obj, _TXN_MODELS) and any(
+            inspect(obj).attrs[k].history.has_changes() for k in _TRACKED
+        ):
+            add(_contribution(*_old_state(obj)), -1)
+            add(_contribution(*(getattr(obj, k) for k in _TRACKED)), 1)
+    for obj in session.deleted:
+        if isinstance(obj, _TXN_MODELS):
+            add(_contribution(*_old_state(obj)), -1)
+
+    params = [{"acc": acc, "delta": d} for acc, d in deltas.items() if d]
+    if params:
+        session.connection().execute(_BUMP_STMT, params)
+        session.info.setdefault("pending_total_accounts", set()).update(deltas)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_bumped_accounts(session, flush_context):
+    # Loaded Account objects still hold the pre-UPDATE value
+    for acc_id in session.info.pop("pending_total_accounts", ()):
+        acc = session.identity_map.get(Account.__mapper__.identity_key_from_primary_key((acc_id,)))
+        if acc is not None:
+            session.expire(acc, ["pending_total"])
+
+
+def reconcile_pending_totals(user_id: int | None = None) -> int:
+    """
+    Recompute pending_total from the ledgers (backfill / drift repair).
+    Returns the number of accounts updated; caller commits.
+    """
+    acc = Account.__table__
+    krw, bdt = (
+        select(func.coalesce(func.sum(-Txn.amount), 0))
+        .where(
+            Txn.account_id == acc.c.id,
+            Txn.is_pending.is_(True),
+            Txn.is_deleted.is_(False),
+            Txn.type.in_(PENDING_TYPES),
+        )
+        .scalar_subquery()
+        for Txn in _TXN_MODELS
+    )
+    stmt = update(acc).values(pending_total=krw + bdt)
+    if user_id is not None:
+        stmt = stmt.where(acc.c.user_id == user_id)
+    return db.session.execute(stmt).rowcount
@@ -31,7 +31,6 @@ def expense_breakdown(user_id: int, currency: str, year: int, month: int, top_n:
             Model.category_id,
             func.coalesce(func.sum(-Model.amount), 0).label("amt")
         )
-        .outerjoin(Category, Category.id == Model.category_id)
         .filter(
             Model.user_id == user_id,
             Model.is_deleted.is_(False),
@@ -43,9 +42,12 @@ def expense_breakdown(user_id: int, currency: str, year: int, month: int, top_n:
         .all()
     )
 
-    # --- load all categories for this user (to resolve parents)
-    # If your Category has user_id, include that filter; otherwise remove it.
-    cats = db.session.query(Category.id, Category.name, Category.parent_id).all()
+    # --- load this user's categories (to resolve parents)
+    cats = (
+        db.session.query(Category.id, Category.name, Category.parent_id)
+        .filter(Category.user_id == user_id)
+        .all()
+    )
     by_id = {cid: {"name": name, "parent_id": pid} for cid, name, pid in cats}
 
     # find top-level ancestor (root) with memoization
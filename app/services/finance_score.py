@@ -5,7 +5,8 @@ from decimal import Decimal
 from typing import Optional, Dict, Any, Tuple, List
 
 from sqlalchemy import func, case, and_
-from app.extensions import db
+from app.extensions import db, cache
+from app.services.cache_versions import data_version
 from app.models import (
     TransactionKRW, TransactionBDT, TxnType, Currency
 )
@@ -156,19 +157,15 @@ def _score_from(inputs: FinanceInputs) -> FinanceScore:
 
 
 
-def get_finance_score(
-    user_id: int,
-    year: Optional[int] = None,
-    month: Optional[int] = None,
-    currency: Optional[str] = None,  # "KRW" | "BDT" | None (both)
-) -> FinanceScore:
-    """
-    By default: current month, both currencies combined.
-    """
-    from datetime import date
-    today = date.today()
-    year = year or today.year
-    month = month or today.month
+# --------------------------
+# Cross-request cache
+# --------------------------
+# Scores are memoized per (user, year, month, currency, "txn" data version);
+# see services/cache_versions.py for how versions are bumped.
+
+@cache.memoize(timeout=300)
+def _cached_score(user_id: int, year: int, month: int, currency: Optional[str], version: str) -> FinanceScore:
+    # `version` only keys the cache (see cache_versions)
     start, end = _month_range(year, month)
 
     inputs = []
@@ -183,3 +180,22 @@ def get_finance_score(
         inputs.append(_sum_components(TransactionBDT, user_id, start, end))
 
     return _score_from(_combine(inputs))
+
+
+def get_finance_score(
+    user_id: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    currency: Optional[str] = None,  # "KRW" | "BDT" | None (both)
+) -> FinanceScore:
+    """
+    By default: current month, both currencies combined.
+    """
+    from datetime import date
+    today = date.today()
+    year = year or today.year
+    month = month or today.month
+    if currency not in (Currency.KRW.value, Currency.BDT.value):
+        currency = None  # both; one cache entry for every "other" value
+
+    return _cached_score(user_id, year, month, currency, data_version("txn", user_id))
@@ -3,12 +3,13 @@ from __future__ import annotations
 import random
 
 from dataclasses import dataclass
+from itertools import combinations
 from typing import List, Optional, Sequence, Tuple
 from datetime import date
 
 from sqlalchemy import and_, func
 from ..extensions import db
-from ..models import LottoGame, LottoDraw, LottoDrawNumber, LottoDrawStats
+from ..models import LottoGame, LottoDraw, LottoDrawNumber, LottoDrawPair, LottoDrawStats
 
 
 @dataclass
@@ -149,6 +150,11 @@ def _get_prev_draw_numbers(game_id: int, round_no: int, k: int = 2) -> List[List
     return results
 
 
+def draw_pairs(draw_id: int, nums_sorted: Sequence[int]) -> List[LottoDrawPair]:
+    """lotto_draw_pair rows for a draw's main numbers (must be sorted, so a < b)."""
+    return [LottoDrawPair(draw_id=draw_id, a=a, b=b) for a, b in combinations(nums_sorted, 2)]
+
+
 def add_draw_from_form(
     round_no: int,
     draw_date: date,
@@ -189,6 +195,9 @@ def add_draw_from_form(
     if game.has_bonus and bonus is not None:
         db.session.add(LottoDrawNumber(draw_id=draw.id, num=int(bonus), position=None, is_bonus=True))
 
+    # Pre-expanded (a < b) pairs for pair-frequency analysis
+    db.session.add_all(draw_pairs(draw.id, nums_sorted))
+
     # Compute stats using previous draws
     prevs = _get_prev_draw_numbers(game.id, round_no, k=2)
     prev1 = prevs[0] if len(prevs) > 0 else None
@@ -220,24 +229,12 @@ def _num_counts(draw_ids: list[int]) -> dict[int, int]:
     return {int(n): int(c) for n, c in rows}
 
 def _pair_counts(draw_ids: list[int]) -> dict[tuple[int, int], int]:
-    # compute pair counts in python to keep code simple and reliable
-    # (window max ~200 keeps it fast)
-    nums_by_draw = {}
-    rows = (db.session.query(LottoDrawNumber.draw_id, LottoDrawNumber.num)
-            .filter(LottoDrawNumber.draw_id.in_(draw_ids),
-                    LottoDrawNumber.is_bonus.is_(False))
+    # pairs are stored per draw (lotto_draw_pair); the DB just counts them
+    rows = (db.session.query(LottoDrawPair.a, LottoDrawPair.b, func.count())
+            .filter(LottoDrawPair.draw_id.in_(draw_ids))
+            .group_by(LottoDrawPair.a, LottoDrawPair.b)
             .all())
-    for did, n in rows:
-        nums_by_draw.setdefault(did, []).append(int(n))
-
-    pair_cnt = {}
-    for nums in nums_by_draw.values():
-        nums = sorted(nums)
-        for i in range(len(nums)):
-            for j in range(i + 1, len(nums)):
-                pair = (nums[i], nums[j])
-                pair_cnt[pair] = pair_cnt.get(pair, 0) + 1
-    return pair_cnt
+    return {(int(a), int(b)): int(c) for a, b, c in rows}
 
 def _stats_targets(draw_ids: list[int]) -> dict:
     # derive typical ranges from stats for the window
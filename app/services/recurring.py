@@ -6,9 +6,8 @@ from sqlalchemy import text
 from ..extensions import db
 from ..models import (
     RecurringRule, RecurringFrequency,
-    Account, AccountType, Currency,
-    TransactionKRW, TransactionBDT,
-    TxnType
+    Account, AccountType,
+    TxnType, TXN_MODEL_BY_CURRENCY,
 )
 from calendar import monthrange
 from datetime import timedelta
@@ -34,7 +33,7 @@ def compute_next_run(prev: date, rule: RecurringRule) -> date:
     return _add_months(prev, rule.every_n, rule.day_of_month)
 
 def _txn_model_for_account(acct: Account):
-    return TransactionKRW if acct.currency == Currency.KRW else TransactionBDT
+    return TXN_MODEL_BY_CURRENCY[acct.currency]
 
 def _apply_account_side_effects(account: Account, ttype: TxnType, amount: Decimal):
     is_pending = False
@@ -63,7 +63,7 @@ def profile():
                 errors["delete"]["confirm_text"] = "Type your account email exactly to confirm."
             if not errors["delete"]:
                 # Remove the user account
-                user = User.query.get(current_user.id)
+                user = db.session.get(User, current_user.id)
                 logout_user()
                 db.session.delete(user)
                 db.session.commit()
@@ -75,12 +75,12 @@
     console.info("[budget] #barByCategory not found or no data.");
   }
 
-  // ---- Line: Yearly Budget vs Spent (optional) ----
-  // To enable, set in your route:
-  // window.__BUDGET_LINE__ = { labels: ["01","02",...,"12"], budget: [...], spent: [...] }
-  const LINE = window.__BUDGET_LINE__ || null;
+  // ---- Line: Yearly Budget vs Spent ----
+  // Loaded after first paint from window.__BUDGET_LINE_URL__, which returns
+  // { labels: ["01","02",...,"12"], budget: [...], spent: [...] }
   const lineEl = $("#lineYear");
-  if (lineEl && LINE && Array.isArray(LINE.labels)) {
+
+  function renderLine(LINE) {
     const ctx = lineEl.getContext("2d");
     new Chart(ctx, {
       type: "line",
@@ -109,8 +109,10 @@
         }
       }
     });
-  } else if (lineEl) {
-    // If canvas exists but no data supplied, show a friendly message
+  }
+
+  function lineUnavailable() {
+    // Canvas exists but no data could be loaded: show a friendly message
     const wrap = lineEl.closest(".card-body");
     if (wrap) {
       const note = document.createElement("div");
@@ -120,6 +122,15 @@
     }
   }
 
+  if (lineEl && window.__BUDGET_LINE_URL__) {
+    fetch(window.__BUDGET_LINE_URL__, { headers: { "Accept": "application/json" } })
+      .then(res => res.ok ? res.json() : null)
+      .then(LINE => (LINE && Array.isArray(LINE.labels)) ? renderLine(LINE) : lineUnavailable())
+      .catch(lineUnavailable);
+  } else if (lineEl) {
+    lineUnavailable();
+  }
+
   // ---- (Optional) Improve accordion caret UX on the table ----
   // If you used ▸ as the toggle, turn it to ▾ when open.
   document.addEventListener("click", (e) => {
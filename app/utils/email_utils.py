@@ -2,9 +2,16 @@ from flask_mail import Message
 from flask import current_app, render_template
 from ..extensions import mail
 # app/utils/mailer.py
+import logging
 import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.message import EmailMessage
 
+logger = logging.getLogger(__name__)
+
+# Small pool so SMTP handshakes never block a request worker
+_mail_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mail")
+
 def send_mail(to_email: str, subject: str, html_body: str, text_body: str | None = None):
     msg = EmailMessage()
     msg["Subject"] = subject
@@ -18,3 +25,17 @@ def send_mail(to_email: str, subject: str, html_body: str, text_body: str | None
             smtp.starttls()
         smtp.login(current_app.config["MAIL_USERNAME"], current_app.config["MAIL_PASSWORD"])
         smtp.send_message(msg)
+
+
+def _send_in_context(app, to_email, subject, html_body, text_body):
+    with app.app_context():
+        try:
+            send_mail(to_email, subject, html_body, text_body)
+        except Exception as e:
+            logger.warning(f"[mail] send to {to_email} failed: {e}")
+
+
+def send_mail_async(to_email: str, subject: str, html_body: str, text_body: str | None = None):
+    """Queue send_mail() on the background pool and return immediately."""
+    app = current_app._get_current_object()
+    return _mail_pool.submit(_send_in_context, app, to_email, subject, html_body, text_body)
@@ -1,10 +1,87 @@
-from flask import request
+from decimal import ROUND_HALF_EVEN, Context, Decimal, InvalidOperation
+from functools import lru_cache, wraps
+from urllib.parse import urlencode
+
+from flask import g, has_app_context, redirect, request, url_for
+
+
+@lru_cache(maxsize=128)
+def _title_for_path(path: str) -> str:
+    path = path.strip("/")
+    if not path:
+        return "Dashboard"
+    return path.replace("-", " ").title()
+
 
 def get_page_title(default="Page"):
     """Return a human-friendly page title based on current path."""
     if not request:
         return default
-    path = request.path.strip("/")
-    if not path:
-        return "Dashboard"
-    return path.replace("-", " ").title()
+    return _title_for_path(request.path)
+
+
+@lru_cache(maxsize=64)
+def _url_for_root(endpoint: str, script_root: str) -> str:
+    return url_for(endpoint)
+
+
+def endpoint_url(endpoint: str) -> str:
+    """url_for() for argument-less endpoints, built once per (endpoint, script_root)."""
+    return _url_for_root(endpoint, request.script_root)
+
+
+def redirect_to(endpoint: str, **qs):
+    """
+    Redirect to an argument-less endpoint with optional ?key=value params
+    (same URL as url_for(endpoint, **qs), without walking the URL map each time).
+    """
+    base = endpoint_url(endpoint)
+    qs = {k: v for k, v in qs.items() if v is not None}
+    return redirect(f"{base}?{urlencode(qs)}" if qs else base)
+
+
+def request_cached(fn):
+    """
+    Memoize `fn` on flask.g, i.e. for the lifetime of the current request
+    (app context), keyed by its arguments. Outside an app context it just calls fn.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not has_app_context():
+            return fn(*args, **kwargs)
+        cache = g.setdefault("_request_cache", {})
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            cache[key] = fn(*args, **kwargs)
+        return cache[key]
+    return wrapper
+
+
+# Money input: one fixed context (no per-call thread-local context lookup)
+# and a prebuilt cent quantum.
+_MONEY_CTX = Context(prec=18, rounding=ROUND_HALF_EVEN)
+_CENT = Decimal("0.01")
+
+
+def parse_money(s: str) -> Decimal:
+    """
+    Parse a form amount into a Decimal rounded to cents.
+    Raises InvalidOperation for malformed or non-finite input.
+    """
+    d = _MONEY_CTX.create_decimal(s)
+    if not d.is_finite():
+        raise InvalidOperation(s)
+    return d.quantize(_CENT, context=_MONEY_CTX)
+
+
+# Display: currency symbol + amount, decimals only when needed
+# (both format strings per currency are built once)
+_SYMBOL = {"KRW": "₩", "BDT": "৳"}
+
+
+def _money_formatter(sym: str):
+    whole, frac = sym + "{:,.0f}", sym + "{:,.2f}"
+    return lambda n: (whole if float(n).is_integer() else frac).format(n)
+
+
+MONEY_FMT = {code: _money_formatter(sym) for code, sym in _SYMBOL.items()}
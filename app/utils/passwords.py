@@ -0,0 +1,40 @@
+# app/utils/passwords.py
+# ------------------------------------------------------------
+# Password hashing with argon2id (C implementation, releases the GIL).
+# - New hashes are argon2; legacy werkzeug hashes (pbkdf2:/scrypt:) still
+#   verify, and needs_rehash() flags them so login can upgrade them.
+# ------------------------------------------------------------
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
+
+_ph = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+# Verified against when there is no stored hash, so a miss costs about the same as a hit
+_DUMMY_HASH = _ph.hash("dummy-password")
+
+
+def hash_password(password: str) -> str:
+    return _ph.hash(password)
+
+
+def verify_password(password_hash: str | None, password: str) -> bool:
+    if not password_hash:
+        try:
+            _ph.verify(_DUMMY_HASH, password)
+        except VerificationError:
+            pass
+        return False
+    if not password_hash.startswith("$argon2"):
+        return check_password_hash(password_hash, password)
+    try:
+        return _ph.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True for legacy werkzeug hashes or argon2 hashes with outdated params."""
+    if not password_hash.startswith("$argon2"):
+        return True
+    return _ph.check_needs_rehash(password_hash)
@@ -0,0 +1,42 @@
+"""partial pending-card indexes on txn tables, month-leading budget unique key
+
+Revision ID: a4c7e2f95b18
+Revises: f1d8b26c4a93
+Create Date: 2026-10-16 01:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e2f95b18'
+down_revision = 'f1d8b26c4a93'
+branch_labels = None
+depends_on = None
+
+PENDING_LIVE = sa.text("is_pending AND NOT is_deleted")
+
+
+def upgrade():
+    for table, prefix in (('transactions_krw', 't_krw'), ('transactions_bdt', 't_bdt')):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(
+                f'ix_{prefix}_user_account_pending', ['user_id', 'account_id', 'date', 'id'], unique=False,
+                postgresql_where=PENDING_LIVE, sqlite_where=PENDING_LIVE,
+            )
+
+    # Same columns, (user_id, year, month) first so month lookups can use it too
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_budget_user_cat_month', type_='unique')
+        batch_op.create_unique_constraint('uq_budget_user_cat_month', ['user_id', 'year', 'month', 'category_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('budgets', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_budget_user_cat_month', type_='unique')
+        batch_op.create_unique_constraint('uq_budget_user_cat_month', ['user_id', 'category_id', 'year', 'month'])
+
+    for table, prefix in (('transactions_bdt', 't_bdt'), ('transactions_krw', 't_krw')):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{prefix}_user_account_pending')
@@ -0,0 +1,34 @@
+"""drop user_id indexes covered by the salary (user_id, date) unique constraints
+
+Revision ID: a7c4e1f9b302
+Revises: e2b9f4c6a1d3
+Create Date: 2026-10-16 05:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e1f9b302'
+down_revision = 'e2b9f4c6a1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # uq_worklog_user_date / uq_holiday_user_date already index (user_id, date);
+    # a user_id-only index is just their prefix, kept up on every write
+    with op.batch_alter_table('work_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_work_logs_user_id')
+
+    with op.batch_alter_table('holidays', schema=None) as batch_op:
+        batch_op.drop_index('ix_holidays_user_id')
+
+
+def downgrade():
+    with op.batch_alter_table('holidays', schema=None) as batch_op:
+        batch_op.create_index('ix_holidays_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('work_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_work_logs_user_id', ['user_id'], unique=False)
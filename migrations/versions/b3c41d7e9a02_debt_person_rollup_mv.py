@@ -0,0 +1,49 @@
+"""debt person rollup materialized view
+
+Revision ID: b3c41d7e9a02
+Revises: 71541f926c0c
+Create Date: 2026-10-15 21:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3c41d7e9a02'
+down_revision = '71541f926c0c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres only (SQLite has no materialized views; the app falls back to a live GROUP BY)
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_debt_person_rollup AS
+        SELECT
+            user_id,
+            direction,
+            recipient_id,
+            count(*)                                            AS item_count,
+            sum(original_principal)                             AS original,
+            sum(original_principal - outstanding_principal)     AS paid,
+            sum(outstanding_principal)                          AS outstanding,
+            sum(CASE WHEN status = 'active' THEN original_principal ELSE 0 END)    AS active_original,
+            sum(CASE WHEN status = 'active' THEN outstanding_principal ELSE 0 END) AS active_outstanding,
+            bool_and(status = 'settled')                        AS is_paid
+        FROM debt_items
+        GROUP BY user_id, direction, recipient_id
+    """)
+    # Unique index: required by REFRESH ... CONCURRENTLY, and serves (user_id, direction) lookups
+    op.execute(
+        "CREATE UNIQUE INDEX ux_mv_debt_person_rollup "
+        "ON mv_debt_person_rollup (user_id, direction, recipient_id)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_debt_person_rollup")
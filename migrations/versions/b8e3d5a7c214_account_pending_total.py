@@ -0,0 +1,42 @@
+"""accounts.pending_total running sum of pending card txns
+
+Revision ID: b8e3d5a7c214
+Revises: a4c7e2f95b18
+Create Date: 2026-10-16 01:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3d5a7c214'
+down_revision = 'a4c7e2f95b18'
+branch_labels = None
+depends_on = None
+
+PENDING_SUM = """
+    COALESCE((SELECT SUM(-t.amount) FROM {table} t
+              WHERE t.account_id = accounts.id
+                AND t.is_pending AND NOT t.is_deleted
+                AND t.type IN ('expense', 'fee')), 0)
+"""
+
+
+def upgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pending_total', sa.Numeric(precision=14, scale=2),
+                                      server_default=sa.text('0'), nullable=False))
+
+    # Backfill from the ledgers (same as `flask reconcile-pending`)
+    op.execute(
+        "UPDATE accounts SET pending_total = "
+        + PENDING_SUM.format(table='transactions_krw')
+        + " + "
+        + PENDING_SUM.format(table='transactions_bdt')
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('accounts', schema=None) as batch_op:
+        batch_op.drop_column('pending_total')
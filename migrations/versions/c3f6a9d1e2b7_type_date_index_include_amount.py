@@ -0,0 +1,34 @@
+"""carry amount/is_deleted in the (user_id, type, date) txn indexes
+
+Revision ID: c3f6a9d1e2b7
+Revises: b8e3d5a7c214
+Create Date: 2026-10-16 02:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f6a9d1e2b7'
+down_revision = 'b8e3d5a7c214'
+branch_labels = None
+depends_on = None
+
+TABLES = (('transactions_krw', 't_krw'), ('transactions_bdt', 't_bdt'))
+
+
+def upgrade():
+    # INCLUDE is Postgres-only; other dialects just get the plain index back
+    for table, prefix in TABLES:
+        op.drop_index(f'ix_{prefix}_user_type_date', table_name=table)
+        op.create_index(
+            f'ix_{prefix}_user_type_date', table, ['user_id', 'type', 'date'], unique=False,
+            postgresql_include=['amount', 'is_deleted'],
+        )
+
+
+def downgrade():
+    for table, prefix in TABLES:
+        op.drop_index(f'ix_{prefix}_user_type_date', table_name=table)
+        op.create_index(f'ix_{prefix}_user_type_date', table, ['user_id', 'type', 'date'], unique=False)
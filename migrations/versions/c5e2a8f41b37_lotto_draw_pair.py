@@ -0,0 +1,42 @@
+"""lotto draw pair table
+
+Revision ID: c5e2a8f41b37
+Revises: b3c41d7e9a02
+Create Date: 2026-10-15 22:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2a8f41b37'
+down_revision = 'b3c41d7e9a02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('lotto_draw_pair',
+    sa.Column('draw_id', sa.BigInteger(), nullable=False),
+    sa.Column('a', sa.SmallInteger(), nullable=False),
+    sa.Column('b', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['draw_id'], ['lotto_draw.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('draw_id', 'a', 'b')
+    )
+
+    # Backfill existing draws: every (a < b) pair of main numbers
+    op.execute("""
+        INSERT INTO lotto_draw_pair (draw_id, a, b)
+        SELECT n1.draw_id, n1.num, n2.num
+        FROM lotto_draw_number n1
+        JOIN lotto_draw_number n2
+          ON n2.draw_id = n1.draw_id
+         AND n2.num > n1.num
+         AND n2.is_bonus = FALSE
+        WHERE n1.is_bonus = FALSE
+    """)
+
+
+def downgrade():
+    op.drop_table('lotto_draw_pair')
@@ -0,0 +1,49 @@
+"""drop the debt person rollup materialized view
+
+Revision ID: c9f2a6d4e8b1
+Revises: b3d8e5a1c7f4
+Create Date: 2026-10-16 05:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f2a6d4e8b1'
+down_revision = 'b3d8e5a1c7f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-person debt totals are aggregated per user from debt_items again
+    # (ix_debt_items_user_status_dir covers it); no whole-table refresh per write
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_debt_person_rollup")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_debt_person_rollup AS
+        SELECT
+            user_id,
+            direction,
+            recipient_id,
+            count(*)                                            AS item_count,
+            sum(original_principal)                             AS original,
+            sum(original_principal - outstanding_principal)     AS paid,
+            sum(outstanding_principal)                          AS outstanding,
+            sum(CASE WHEN status = 'active' THEN original_principal ELSE 0 END)    AS active_original,
+            sum(CASE WHEN status = 'active' THEN outstanding_principal ELSE 0 END) AS active_outstanding,
+            bool_and(status = 'settled')                        AS is_paid
+        FROM debt_items
+        GROUP BY user_id, direction, recipient_id
+    """)
+    op.execute(
+        "CREATE UNIQUE INDEX ux_mv_debt_person_rollup "
+        "ON mv_debt_person_rollup (user_id, direction, recipient_id)"
+    )
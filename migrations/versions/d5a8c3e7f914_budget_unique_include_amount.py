@@ -0,0 +1,37 @@
+"""carry amount in the budget / budget-type unique keys
+
+Revision ID: d5a8c3e7f914
+Revises: c3f6a9d1e2b7
+Create Date: 2026-10-16 02:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8c3e7f914'
+down_revision = 'c3f6a9d1e2b7'
+branch_labels = None
+depends_on = None
+
+KEYS = (
+    ('budgets', 'uq_budget_user_cat_month', ['user_id', 'year', 'month', 'category_id']),
+    ('budgets_type', 'uq_btype_user_year_month_type', ['user_id', 'year', 'month', 'txn_type']),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return  # INCLUDE is Postgres-only; nothing to change elsewhere
+    for table, name, cols in KEYS:
+        op.drop_constraint(name, table, type_='unique')
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({', '.join(cols)}) INCLUDE (amount)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, name, cols in KEYS:
+        op.drop_constraint(name, table, type_='unique')
+        op.create_unique_constraint(name, table, cols)
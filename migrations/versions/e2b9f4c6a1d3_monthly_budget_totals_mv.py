@@ -0,0 +1,76 @@
+"""monthly budget totals materialized view (budget page year chart)
+
+Revision ID: e2b9f4c6a1d3
+Revises: d5a8c3e7f914
+Create Date: 2026-10-16 03:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b9f4c6a1d3'
+down_revision = 'd5a8c3e7f914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres only (SQLite has no materialized views; the app falls back to live GROUP BYs).
+    # Same numbers as services.budgeting.compute_year_lines (KRW only):
+    #   budget = parent-category budgets + the transfer_international type budget
+    #   spent  = expense/fee in the user's category tree (minus card settlements)
+    #            + transfer_international
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_monthly_budget_totals AS
+        WITH RECURSIVE tree AS (
+            SELECT id, user_id FROM categories WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, c.user_id
+            FROM categories c JOIN tree t ON c.parent_id = t.id AND c.user_id = t.user_id
+        ),
+        parts AS (
+            SELECT b.user_id, b.year, b.month, b.amount AS budget, 0 AS spent
+            FROM budgets b
+            JOIN categories c ON c.id = b.category_id AND c.user_id = b.user_id AND c.parent_id IS NULL
+            UNION ALL
+            SELECT user_id, year, month, amount, 0
+            FROM budgets_type
+            WHERE txn_type = 'transfer_international'
+            UNION ALL
+            SELECT t.user_id,
+                   extract(year FROM t.date)::int,
+                   extract(month FROM t.date)::int,
+                   0,
+                   -t.amount
+            FROM transactions_krw t
+            WHERE NOT t.is_deleted
+              AND (
+                    (t.type IN ('expense', 'fee')
+                     AND NOT (lower(coalesce(t.note, '')) LIKE '%credit%card%'
+                              AND lower(coalesce(t.note, '')) LIKE '%settlement%')
+                     AND EXISTS (SELECT 1 FROM tree WHERE tree.id = t.category_id
+                                                      AND tree.user_id = t.user_id))
+                    OR t.type = 'transfer_international'
+                  )
+        )
+        SELECT user_id, year, month,
+               sum(budget) AS budget_total,
+               sum(spent)  AS spent_total
+        FROM parts
+        GROUP BY user_id, year, month
+    """)
+    # Unique index: required by REFRESH ... CONCURRENTLY, and serves the (user_id, year) lookup
+    op.execute(
+        "CREATE UNIQUE INDEX ux_mv_monthly_budget_totals "
+        "ON mv_monthly_budget_totals (user_id, year, month)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_monthly_budget_totals")
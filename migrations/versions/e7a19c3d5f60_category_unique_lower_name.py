@@ -0,0 +1,65 @@
+"""category case-insensitive unique name index
+
+Revision ID: e7a19c3d5f60
+Revises: c5e2a8f41b37
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a19c3d5f60'
+down_revision = 'c5e2a8f41b37'
+branch_labels = None
+depends_on = None
+
+
+def _rename_case_duplicates():
+    # Categories differing only by case under the same user/parent would fail
+    # the index below: keep the oldest name, suffix the others " (2)", " (3)", ...
+    # Renaming (not merging) leaves every transaction/budget reference untouched.
+    categories = sa.table(
+        'categories',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('parent_id', sa.Integer),
+        sa.column('name', sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(categories.c.id, categories.c.user_id, categories.c.parent_id, categories.c.name)
+        .order_by(categories.c.id)
+    ).all()
+
+    taken = {(r.user_id, r.parent_id or 0, r.name.lower()) for r in rows}
+    seen = set()
+    for r in rows:
+        key = (r.user_id, r.parent_id or 0, r.name.lower())
+        if key not in seen:
+            seen.add(key)
+            continue
+        n = 2
+        while (r.user_id, r.parent_id or 0, f"{r.name[:110]} ({n})".lower()) in taken:
+            n += 1
+        new_name = f"{r.name[:110]} ({n})"
+        taken.add((r.user_id, r.parent_id or 0, new_name.lower()))
+        bind.execute(categories.update().where(categories.c.id == r.id).values(name=new_name))
+
+
+def upgrade():
+    _rename_case_duplicates()
+
+    # Unique per user, parent (NULL -> 0) and lower(name); backs INSERT ... ON CONFLICT
+    op.create_index(
+        'ux_category_user_parent_lower',
+        'categories',
+        ['user_id', sa.text('coalesce(parent_id, 0)'), sa.text('lower(name)')],
+        unique=True,
+    )
+
+
+def downgrade():
+    # renamed duplicates keep their new names
+    op.drop_index('ux_category_user_parent_lower', table_name='categories')
@@ -0,0 +1,51 @@
+"""composite indexes for debt and lotto hot queries
+
+Revision ID: f1d8b26c4a93
+Revises: e7a19c3d5f60
+Create Date: 2026-10-16 00:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d8b26c4a93'
+down_revision = 'e7a19c3d5f60'
+branch_labels = None
+depends_on = None
+
+OPEN_ITEMS = sa.text("status = 'active' AND outstanding_principal > 0")
+
+
+def upgrade():
+    with op.batch_alter_table('debt_items', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_debt_items_user_status_dir', ['user_id', 'status', 'direction'], unique=False,
+            postgresql_include=['original_principal', 'outstanding_principal', 'recipient_id'],
+        )
+        batch_op.create_index(
+            'ix_debt_items_user_open', ['user_id', 'recipient_id', 'direction', 'start_date', 'id'], unique=False,
+            postgresql_where=OPEN_ITEMS, sqlite_where=OPEN_ITEMS,
+        )
+
+    # (user_id, date) -> (user_id, date, id): also serves the id tie-break in ORDER BY
+    with op.batch_alter_table('debt_txns', schema=None) as batch_op:
+        batch_op.drop_index('ix_debt_txns_user_date')
+        batch_op.create_index('ix_debt_txns_user_date_id', ['user_id', 'date', 'id'], unique=False)
+
+    with op.batch_alter_table('lotto_draw_number', schema=None) as batch_op:
+        batch_op.create_index('idx_lotto_draw_number_draw_bonus_num', ['draw_id', 'is_bonus', 'num'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('lotto_draw_number', schema=None) as batch_op:
+        batch_op.drop_index('idx_lotto_draw_number_draw_bonus_num')
+
+    with op.batch_alter_table('debt_txns', schema=None) as batch_op:
+        batch_op.drop_index('ix_debt_txns_user_date_id')
+        batch_op.create_index('ix_debt_txns_user_date', ['user_id', 'date'], unique=False)
+
+    with op.batch_alter_table('debt_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_debt_items_user_open')
+        batch_op.drop_index('ix_debt_items_user_status_dir')
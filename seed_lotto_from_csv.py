@@ -18,7 +18,7 @@ from typing import List, Optional, Tuple
 
 from app import create_app, db
 from app.models import LottoGame, LottoDraw, LottoDrawNumber, LottoDrawStats
-from app.services.lotto_service import compute_draw_stats
+from app.services.lotto_service import compute_draw_stats, draw_pairs
 
 
 # ✅ Put CSV in your project root and set this filename
@@ -169,6 +169,9 @@ def seed():
                 )
             )
 
+            # Pre-expanded pairs (lotto_draw_pair)
+            db.session.add_all(draw_pairs(draw.id, nums_sorted))
+
             # Previous draws for repeat metrics (prev1, prev2)
             prev_draws = (
                 LottoDraw.query